@@ -0,0 +1,228 @@
+"""
+基準測試用的本機模擬伺服器（不連外網）
+
+同一個 ThreadingHTTPServer 提供：
+  GET  /feeds/<名稱>                                  fixtures/ 中錄好的 RSS / Atom（支援 ETag / 304、gzip）
+  POST /openai/v1/chat/completions                     OpenAI Chat Completions（stream: true 時回 SSE）
+  POST /openai/v1/responses                            OpenAI Responses API（stream: true 時回 SSE）
+  POST /gemini/v1beta/models/<model>:generateContent   Gemini（一次回應）
+  POST /gemini/v1beta/models/<model>:streamGenerateContent?alt=sse
+  POST /telegram/bot<token>/sendMessage                Telegram
+
+MockConfig 可調整回應延遲、串流逐段間隔與 429 注入比例（固定亂數種子，每次結果可重現）。
+"""
+import os
+import re
+import sys
+import gzip
+import json
+import time
+import random
+import threading
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+DIGEST_REPLY = "\n".join(
+    ["<b>📰 分類</b>"]
+    + [f"• <b>模擬標題 {i}</b>：這是基準測試用的一句話摘要，長度與實際輸出相近。" for i in range(1, 6)]
+)
+
+
+@dataclass
+class MockConfig:
+    feed_latency: float = 0.0        # 每個 feed 回應前等待秒數
+    llm_latency: float = 0.0         # LLM 首個 token 前等待秒數（模擬排隊與 prefill）
+    llm_chunk_delay: float = 0.0     # 串流每段之間的間隔
+    llm_chunks: int = 20             # 回應切成幾段串流
+    telegram_latency: float = 0.0
+    rate_429: float = 0.0            # LLM 與 Telegram 請求回 429 的比例
+    retry_after: int = 1             # 429 時要求等待的秒數
+    reply: str = DIGEST_REPLY        # LLM 回應內容
+    seed: int = 1234
+
+
+def load_fixtures(large_items: int = 4000) -> dict[str, bytes]:
+    """讀入 fixtures/，另外以自由時報的 item 重複組出一個大型 feed（large.xml）"""
+    fixtures = {}
+    for name in sorted(os.listdir(FIXTURE_DIR)):
+        with open(os.path.join(FIXTURE_DIR, name), "rb") as f:
+            fixtures[name] = f.read()
+    source = fixtures["rss_ltn.xml"]
+    items  = re.findall(rb"<item>.*?</item>", source, re.DOTALL)
+    head   = source[:source.index(b"<item>")]
+    tail   = source[source.rindex(b"</item>") + len(b"</item>"):]
+    fixtures["large.xml"] = head + b"\n".join(items[i % len(items)] for i in range(large_items)) + tail
+    return fixtures
+
+
+class _QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # 用戶端提早結束串流或連線池關閉閒置連線都屬正常，不印 traceback
+        if not isinstance(sys.exc_info()[1], (ConnectionError, TimeoutError)):
+            super().handle_error(request, client_address)
+
+
+class MockServer:
+    def __init__(self, config: MockConfig | None = None, fixtures: dict[str, bytes] | None = None):
+        self.config   = config or MockConfig()
+        self.fixtures = fixtures if fixtures is not None else load_fixtures()
+        self.counts   = {}
+        self._rng     = random.Random(self.config.seed)
+        self._lock    = threading.Lock()
+        self._httpd   = _QuietServer(("127.0.0.1", 0), self._handler())
+        self.base_url = f"http://127.0.0.1:{self._httpd.server_port}"
+
+    # ─── 對外介面 ───
+    def start(self) -> "MockServer":
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def feed_url(self, name: str) -> str:
+        return f"{self.base_url}/feeds/{name}"
+
+    def env(self) -> dict[str, str]:
+        """讓 Bot 指向模擬伺服器的環境變數"""
+        return {
+            "OPENAI_BASE_URL":   f"{self.base_url}/openai/v1",
+            "GEMINI_BASE_URL":   f"{self.base_url}/gemini/v1beta",
+            "TELEGRAM_API_BASE": f"{self.base_url}/telegram",
+        }
+
+    # ─── 內部 ───
+    def _count(self, key: str):
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def _inject_429(self) -> bool:
+        with self._lock:
+            return self._rng.random() < self.config.rate_429
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: bytes, content_type: str = "application/json", headers: dict | None = None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _json(self, status: int, obj, headers: dict | None = None):
+                self._send(status, json.dumps(obj, ensure_ascii=False).encode("utf-8"), headers=headers)
+
+            def do_GET(self):
+                name = self.path.split("?")[0].rsplit("/", 1)[-1]
+                body = server.fixtures.get(name)
+                if not self.path.startswith("/feeds/") or body is None:
+                    return self._send(404, b"not found", "text/plain")
+                server._count("feed")
+                time.sleep(server.config.feed_latency)
+                etag = f'"{len(body)}"'
+                if self.headers.get("If-None-Match") == etag:
+                    server._count("feed_304")
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                headers = {"ETag": etag}
+                if "gzip" in (self.headers.get("Accept-Encoding") or ""):
+                    body = gzip.compress(body, 6)
+                    headers["Content-Encoding"] = "gzip"
+                self._send(200, body, "application/rss+xml; charset=utf-8", headers)
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                path    = self.path.split("?")[0]
+                if path.startswith("/telegram/"):
+                    return self._telegram(payload)
+                if path.startswith("/openai/") or path.startswith("/gemini/"):
+                    return self._llm(path, payload)
+                self._send(404, b"not found", "text/plain")
+
+            def _telegram(self, payload: dict):
+                server._count("telegram")
+                time.sleep(server.config.telegram_latency)
+                if server._inject_429():
+                    server._count("telegram_429")
+                    return self._json(429, {
+                        "ok": False, "error_code": 429,
+                        "description": f"Too Many Requests: retry after {server.config.retry_after}",
+                        "parameters": {"retry_after": server.config.retry_after},
+                    })
+                self._json(200, {"ok": True, "result": {"message_id": 1, "chat": {"id": payload.get("chat_id")}}})
+
+            def _llm(self, path: str, payload: dict):
+                kind = "gemini" if path.startswith("/gemini/") else "responses" if path.endswith("/responses") else "chat"
+                server._count(kind)
+                if server._inject_429():
+                    server._count(f"{kind}_429")
+                    return self._json(429, {"error": {"code": 429, "message": "Resource exhausted"}},
+                                      headers={"Retry-After": str(server.config.retry_after)})
+                time.sleep(server.config.llm_latency)
+                reply  = server.config.reply
+                stream = payload.get("stream") or path.endswith(":streamGenerateContent")
+                if not stream:
+                    return self._json(200, self._whole(kind, reply))
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                size = max(1, -(-len(reply) // server.config.llm_chunks))
+                for i in range(0, len(reply), size):
+                    self._event(self._delta(kind, reply[i:i + size]))
+                    time.sleep(server.config.llm_chunk_delay)
+                if kind == "chat":
+                    self._event("[DONE]")
+                elif kind == "responses":
+                    self._event(json.dumps({"type": "response.completed"}), "response.completed")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _event(self, data: str, event: str | None = None):
+                text  = (f"event: {event}\n" if event else "") + f"data: {data}\n\n"
+                chunk = text.encode("utf-8")
+                try:
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass   # 用戶端提早結束串流
+
+            @staticmethod
+            def _delta(kind: str, text: str) -> str:
+                if kind == "chat":
+                    return json.dumps({"choices": [{"delta": {"content": text}}]}, ensure_ascii=False)
+                if kind == "responses":
+                    return json.dumps({"type": "response.output_text.delta", "delta": text}, ensure_ascii=False)
+                return json.dumps({"candidates": [{"content": {"parts": [{"text": text}]}}]}, ensure_ascii=False)
+
+            @staticmethod
+            def _whole(kind: str, text: str) -> dict:
+                if kind == "chat":
+                    return {"choices": [{"message": {"content": text}}]}
+                if kind == "responses":
+                    return {"output": [{"type": "message", "content": [{"type": "output_text", "text": text}]}]}
+                return {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+
+        return Handler
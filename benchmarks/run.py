@@ -0,0 +1,447 @@
+"""
+離線基準測試：不連外網，量測各階段的延遲百分位數與吞吐量
+
+  - RSS / Atom：重播 fixtures/ 中錄好的 feed（含大型與格式錯誤的），由本機模擬伺服器提供
+  - OpenAI / Gemini / Telegram：本機模擬 API，可設定延遲與 429 比例（見 mock_servers.py）
+  - 階段：parse_rss、執行緒內 / 子行程解析（20、200、2000 個來源）、摘要去 HTML、日期過濾、黑名單比對、fetcher.fetch_all（冷啟動 / 304）、近似重複分群、build_prompt、LLM 呼叫、Telegram 推播、
+    news_bot_gemini 完整執行
+
+用法：
+  python benchmarks/run.py                          # 完整測試
+  python benchmarks/run.py --quick                  # CI 用，次數較少
+  python benchmarks/run.py --latency 0.05 --rate-429 0.1 --json bench.json
+"""
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import tempfile
+import unicodedata
+import importlib
+import contextlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.dirname(os.path.abspath(__file__))]
+
+from mock_servers import MockConfig, MockServer   # noqa: E402
+
+FEED_CHUNK = 16 * 1024
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, round(q * (len(ordered) - 1)))]
+
+
+def measure(stage: str, fn, runs: int, unit: str = "", warmup: int = 1) -> dict:
+    """
+    執行 fn() runs 次（前面先暖身），fn 回傳本次處理量（位元組、則數…），用來算吞吐量。
+    丟出例外的次數記在 errors（例如注入 429 而沒有重試的呼叫），延遲仍照算
+    """
+    samples, amount, errors = [], 0, 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(warmup + runs):
+            start = time.perf_counter()
+            try:
+                done = fn() or 0
+            except Exception:
+                done, errors = 0, errors + (i >= warmup)
+            if i >= warmup:
+                amount += done
+                samples.append(time.perf_counter() - start)
+    total = sum(samples)
+    return {
+        "stage":      stage,
+        "runs":       runs,
+        "p50_ms":     round(percentile(samples, 0.50) * 1000, 3),
+        "p90_ms":     round(percentile(samples, 0.90) * 1000, 3),
+        "p99_ms":     round(percentile(samples, 0.99) * 1000, 3),
+        "max_ms":     round(max(samples) * 1000, 3),
+        "throughput": round(amount / total, 2) if unit and total else None,
+        "unit":       unit,
+        "errors":     errors,
+    }
+
+
+def chunked(data: bytes, counter: list[int]):
+    for i in range(0, len(data), FEED_CHUNK):
+        counter[0] += min(FEED_CHUNK, len(data) - i)
+        yield data[i:i + FEED_CHUNK]
+
+
+def bench_parse(server: MockServer, runs: int) -> list[dict]:
+    from botcore.dates import DateWindow
+    from botcore.feeds import parse_rss
+
+    results = []
+    for name, data in server.fixtures.items():
+        def run(data=data):
+            consumed = [0]
+            parse_rss(chunked(data, consumed))   # 不過濾日期
+            return consumed[0] / 1e6
+        results.append(measure(f"parse_rss {name}", run, runs, "MB/s"))
+
+    large = server.fixtures["large.xml"]
+
+    def full_scan():
+        # 日期都不是今天 + 不限則數：整份掃完，量測最壞情況的解析速度
+        consumed = [0]
+        parse_rss(chunked(large, consumed), max_items=10**9, date_filter=DateWindow().for_feed())
+        return consumed[0] / 1e6
+    results.append(measure("parse_rss large.xml 全部掃描", full_scan, max(1, runs // 10), "MB/s"))
+    return results
+
+
+def bench_parse_pool(server: MockServer, runs: int, sizes: list[int], processes: int) -> list[dict]:
+    """解析 sizes 個來源：執行緒內解析（原本的路徑）與 ParsePool 子行程解析的比較，內容已在記憶體中，只量解析"""
+    from concurrent.futures import ThreadPoolExecutor
+    from botcore.blacklist import Blacklist
+    from botcore.dates import DateWindow
+    from botcore.feeds import ParsePool, parse_rss, read_chunks
+
+    blobs     = [data for _, data in sorted(server.fixtures.items())]
+    blacklist = Blacklist(["博弈"], path="")
+    window    = DateWindow()   # fixture 的日期都不是今天：每個來源都掃滿 max_items 則，是解析最重的情況
+    pool      = ParsePool(processes, parse_rss, blacklist)
+    results   = []
+    try:
+        with ThreadPoolExecutor(max_workers=8) as threads:   # 與 FeedFetcher 預設的抓取執行緒數相同
+            list(threads.map(lambda data: pool.parse(data, window.now, None), blobs * processes))   # 先把子行程都啟動
+            for size in sizes:
+                batch = [blobs[i % len(blobs)] for i in range(size)]
+
+                def inline(batch=batch):
+                    list(threads.map(lambda data: parse_rss(read_chunks(io.BytesIO(data)), date_filter=window.for_feed(), blacklist=blacklist), batch))
+                    return len(batch)
+
+                def pooled(batch=batch):
+                    list(threads.map(lambda data: pool.parse(data, window.now, None), batch))
+                    return len(batch)
+                size_runs = max(1, runs * 20 // size) if size > 20 else runs
+                results.append(measure(f"解析 {size} 個來源 執行緒內", inline, size_runs, "feeds/s"))
+                results.append(measure(f"解析 {size} 個來源 {processes} 個子行程", pooled, size_runs, "feeds/s"))
+    finally:
+        pool.close()
+    return results
+
+
+def bench_clean(server: MockServer, runs: int) -> list[dict]:
+    """摘要去 HTML：原本的 re.sub(r"<[^>]+>", "", desc)[:300] 與 text.clean_html 的比較"""
+    import html
+    import re
+    import xml.etree.ElementTree as ET
+    from botcore.text import clean_html
+
+    descs = []
+    for name in ("rss_ltn.xml", "rss_feedburner.xml", "atom_verge.xml"):
+        root = ET.fromstring(server.fixtures[name])
+        descs += [el.text or "" for el in root.iter() if el.tag.rsplit("}", 1)[-1] in ("description", "summary")]
+    # The Verge、TechCrunch 這類整篇文章放進摘要的來源：約 20 KB 的 HTML
+    paragraph = "<p>OpenAI&#8217;s new model &amp; <a href=\"https://example.com/x\">Gemini</a> 在台灣的測試結果&nbsp;…</p>\n"
+    article   = "<figure><img src=\"https://example.com/a.jpg\"/></figure>" + paragraph * 200
+    descs    += [article] * 20
+
+    def naive():
+        for desc in descs:
+            re.sub(r"<[^>]+>", "", desc.strip())[:300]
+        return len(descs)
+
+    def naive_unescape():
+        # 只是補上實體解碼的話，仍然要先處理完整段 HTML
+        for desc in descs:
+            html.unescape(re.sub(r"<[^>]+>", "", desc.strip()))[:300]
+        return len(descs)
+
+    def cleaned():
+        for desc in descs:
+            clean_html(desc)
+        return len(descs)
+    return [
+        measure(f"摘要去 HTML re.sub（{len(descs)} 則）", naive, runs, "items/s"),
+        measure(f"摘要去 HTML re.sub + unescape（{len(descs)} 則）", naive_unescape, runs, "items/s"),
+        measure(f"摘要去 HTML clean_html（{len(descs)} 則）", cleaned, runs, "items/s"),
+    ]
+
+
+def bench_dates(server: MockServer, runs: int) -> list[dict]:
+    """日期過濾：原本每則 parsedate_to_datetime + datetime.now() 與 DateWindow（快速路徑 + 快取）的比較"""
+    import re
+    from datetime import datetime
+    from email.utils import parsedate_to_datetime
+    from botcore.config import TW_TZ
+    from botcore.dates import DateWindow, parse_timestamp
+
+    dates = []
+    for data in server.fixtures.values():
+        dates += re.findall(r"<(?:pubDate|published|updated)>([^<]+)<", data.decode("utf-8", "replace"))
+
+    def is_today(pub_date: str) -> bool:
+        try:
+            return parsedate_to_datetime(pub_date).astimezone(TW_TZ).date() == datetime.now(TW_TZ).date()
+        except Exception:
+            try:
+                return datetime.fromisoformat(pub_date.replace("Z", "+00:00")).astimezone(TW_TZ).date() == datetime.now(TW_TZ).date()
+            except Exception:
+                return True
+
+    def stdlib():
+        for pub_date in dates:
+            is_today(pub_date)
+        return len(dates)
+
+    def window_cold():
+        parse_timestamp.cache_clear()   # 只量正規表示式快速路徑
+        accepts = DateWindow().for_feed()
+        for pub_date in dates:
+            accepts(pub_date)
+        return len(dates)
+
+    def window_warm():
+        accepts = DateWindow().for_feed()
+        for pub_date in dates:
+            accepts(pub_date)
+        return len(dates)
+    return [
+        measure(f"日期過濾 parsedate_to_datetime（{len(dates)} 則）", stdlib, runs, "items/s"),
+        measure(f"日期過濾 DateWindow 無快取（{len(dates)} 則）", window_cold, runs, "items/s"),
+        measure(f"日期過濾 DateWindow 有快取（{len(dates)} 則）", window_warm, runs, "items/s"),
+    ]
+
+
+def bench_blacklist(runs: int, rules: int) -> list[dict]:
+    """黑名單比對：原本的 any(kw in title) 與 Aho-Corasick 在 rules 條規則下的比較"""
+    import random
+    from botcore.blacklist import Blacklist
+
+    rng      = random.Random(42)
+    alphabet = "預測市場博弈娛樂城業配新聞科技台灣國際財經股票選舉颱風疫苗晶片"
+    keywords = list({"".join(rng.choice(alphabet) for _ in range(rng.randint(3, 6))) for _ in range(rules)})
+    items    = [
+        {"title": "".join(rng.choice(alphabet) for _ in range(30)), "description": "", "link": f"https://example.com/{i}"}
+        for i in range(200)
+    ]
+    blacklist = Blacklist(keywords, path="")
+    len(blacklist)   # 先建好自動機，量測的是比對本身
+
+    def naive():
+        for item in items:
+            any(kw in item["title"] for kw in keywords)
+        return len(items)
+
+    def automaton():
+        for item in items:
+            blacklist.match(item)
+        return len(items)
+    return [
+        measure(f"黑名單 any(kw in title)（{len(keywords)} 條）", naive, runs, "items/s"),
+        measure(f"黑名單 Aho-Corasick（{len(keywords)} 條）", automaton, runs, "items/s"),
+    ]
+
+
+def bench_archive(runs: int, history: int) -> list[dict]:
+    """新聞存檔：一個分類一個交易的寫入，以及 history 則歷史中 FTS5 trigram 查詢與 LIKE 全表掃描的比較"""
+    import random
+    from botcore.archive import Archive
+
+    rng      = random.Random(42)
+    alphabet = "預測市場博弈娛樂城業配新聞科技台灣國際財經股票選舉颱風疫苗晶片積電半導體"
+    now      = time.time()
+    store    = Archive(os.path.join(tempfile.mkdtemp(prefix="newsbot-archive-"), "archive.sqlite3"))
+
+    def batch(n: int, start: float) -> list[dict]:
+        return [{
+            "title":       "".join(rng.choice(alphabet) for _ in range(24)) + f" {rng.random()}"
+                           + (" 輝達財報" if rng.random() < 0.002 else ""),   # 約千分之二的新聞才有的關鍵字
+            "link":        f"https://example.com/{rng.random()}",
+            "description": "".join(rng.choice(alphabet) for _ in range(150)),
+            "source":      "https://example.com/rss",
+            "published":   time.strftime("%a, %d %b %Y %H:%M:%S +0000", time.gmtime(start - rng.random() * 86400)),
+        } for _ in range(n)]
+
+    # 約 history / 200 天的歷史（每天 200 則）
+    with contextlib.redirect_stdout(io.StringIO()):
+        for day in range(0, history, 200):
+            store.add("💰 財經新聞", batch(min(200, history - day), now - day / 200 * 86400), now)
+    batches = [batch(50, now) for _ in range(runs + 1)]
+
+    def write():
+        return store.add("💰 財經新聞", batches.pop())
+
+    def fts():
+        return len(store.search("輝達財報", limit=20))
+
+    def like():
+        return len(store.search("輝達", limit=20))   # 兩個字，trigram 索引用不上，整個表掃過
+    return [
+        measure("存檔寫入（一個分類 50 則，一個交易）", write, runs, "items/s"),
+        measure(f"存檔查詢 FTS5 trigram（{history} 則）", fts, runs),
+        measure(f"存檔查詢 LIKE（{history} 則）", like, runs),
+    ]
+
+
+def feed_config(server: MockServer, copies: int) -> dict[str, list[str]]:
+    names = ["rss_ltn.xml", "atom_verge.xml", "rss_feedburner.xml", "malformed_truncated.xml", "malformed_entity.xml"]
+    return {
+        f"分類{c}": [f"{server.feed_url(name)}?copy={c}" for name in names]
+        for c in range(copies)
+    }
+
+
+def bench_pipeline(news_bot, gemini_bot, server: MockServer, runs: int, feeds: int, recipients: int) -> list[dict]:
+    from botcore import dedup, subscribers, telegram
+    from botcore.config import STATE_DIR
+    from botcore.feeds import FeedFetcher, FeedSources
+    from botcore.seen_store import SeenStore
+
+    results = []
+    rss_feeds = feed_config(server, max(1, feeds // 5))
+    feed_count = sum(len(urls) for urls in rss_feeds.values())
+    for bot in (news_bot, gemini_bot):
+        bot.fetcher = FeedFetcher(
+            FeedSources(rss_feeds, {}, bot.TITLE_BLACKLIST, default_lookback=float("inf")),   # fixture 日期固定，全部保留
+            max_workers=bot.fetcher.max_workers,
+            per_host=bot.fetcher.max_workers,   # 模擬伺服器只有一個 host，不套用單一網站的連線上限
+            deadline=bot.fetcher.deadline,
+        )
+
+    def fetch_cold():
+        news_bot.fetcher.fetch_all({}, SeenStore())
+        return feed_count
+    results.append(measure(f"fetcher.fetch_all 冷啟動（{feed_count} 個來源）", fetch_cold, runs, "feeds/s"))
+
+    warm_cache = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        all_news = news_bot.fetcher.fetch_all(warm_cache, SeenStore())
+
+    def fetch_warm():
+        news_bot.fetcher.fetch_all(warm_cache, SeenStore())
+        return feed_count
+    results.append(measure(f"fetcher.fetch_all 304（{feed_count} 個來源）", fetch_warm, runs, "feeds/s"))
+
+    items = sum(len(v) for v in all_news.values())
+
+    def cluster():
+        dedup.cluster_news(all_news)
+        return items
+    results.append(measure(f"cluster_news（{items} 則）", cluster, runs, "items/s"))
+
+    clustered, _ = dedup.cluster_news(all_news)
+
+    def prompt():
+        news_bot.build_prompt(clustered)
+        return items
+    results.append(measure("build_prompt", prompt, runs, "items/s"))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        prompt_text = news_bot.build_prompt(clustered)
+    results.append(measure("call_ai OpenAI（串流）", lambda: news_bot.call_ai(prompt_text) and 1, runs, "calls/s"))
+    results.append(measure("call_ai Gemini（串流）", lambda: gemini_bot.call_ai(prompt_text) and 1, runs, "calls/s"))
+
+    digest = "\n\n".join(["<b>📰 每日新聞摘要</b>"] + [server.config.reply] * 12)
+    batch  = [0]
+
+    def send():
+        batch[0] += 1   # 每次換一批 chat_id，避免被「每個 chat 每秒 1 則」的限制拖慢
+        chat_ids = [f"{batch[0]}-{i}" for i in range(recipients)]
+        report = telegram.broadcast("TOKEN", chat_ids, digest)
+        return sum(r["sent"] for r in report)
+    results.append(measure(f"telegram.broadcast（{recipients} 位收件者）", send, runs, "msgs/s"))
+
+    # 依分類偏好分組：4 種偏好輪流分給收件者，每種偏好只組裝一次摘要
+    categories = list(rss_feeds)
+    signatures = [tuple(categories), tuple(categories[:1]), tuple(categories[:2]), tuple(categories[-1:])]
+    sections   = {category: f"<b>{category}</b>\n{server.config.reply}" for category in categories}
+
+    def send_preferences():
+        batch[0] += 1
+        chat_ids = [f"{batch[0]}-{i}" for i in range(recipients)]
+        prefs    = {chat_id: signatures[i % len(signatures)] for i, chat_id in enumerate(chat_ids)}
+        digest   = subscribers.Digest("<b>📰 每日新聞摘要</b>\n", sections)
+        report   = telegram.deliver("TOKEN", digest.batches(subscribers.group(chat_ids, prefs, categories)))
+        return sum(r["sent"] for r in report)
+    results.append(measure(f"telegram.deliver 依偏好分組（{recipients} 位收件者、{len(signatures)} 種偏好）",
+                           send_preferences, runs, "msgs/s"))
+
+    def end_to_end():
+        telegram.limiter = telegram.TelegramLimiter(30, 1)   # 每次都從空的限速狀態開始，與實際排程相同
+        for name in ("feed_cache.json", "seen_titles.bin", "seen_bands.bin"):
+            path = os.path.join(STATE_DIR, name)
+            if os.path.exists(path):
+                os.remove(path)
+        gemini_bot.main()
+        return 1
+    results.append(measure("news_bot_gemini.main 完整執行", end_to_end, max(1, runs // 5), "runs/s"))
+    return results
+
+
+def display_width(text: str) -> int:
+    return sum(2 if unicodedata.east_asian_width(ch) in "WF" else 1 for ch in text)
+
+
+def pad(text: str, width: int) -> str:
+    """依顯示寬度補空白（中文字佔兩格）"""
+    return text + " " * max(0, width - display_width(text))
+
+
+def print_table(results: list[dict]):
+    width = max(display_width(r["stage"]) for r in results) + 2
+    print(f"{pad('階段', width)}{pad('次數', 6)}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}  失敗  吞吐量")
+    for r in results:
+        tp = f"{r['throughput']:,.2f} {r['unit']}" if r["throughput"] is not None else ""
+        print(f"{pad(r['stage'], width)}{r['runs']:<6}{r['p50_ms']:>10.2f}{r['p90_ms']:>10.2f}"
+              f"{r['p99_ms']:>10.2f}{r['max_ms']:>10.2f}  {r['errors']:<4}  {tp}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="每日新聞 Bot 離線基準測試")
+    parser.add_argument("--quick", action="store_true", help="減少次數（CI 用）")
+    parser.add_argument("--runs", type=int, default=None, help="每個階段執行次數")
+    parser.add_argument("--feeds", type=int, default=25, help="fetch 階段的來源數")
+    parser.add_argument("--blacklist-rules", type=int, default=5000, help="黑名單比對階段的規則數")
+    parser.add_argument("--parse-feeds", default="20,200,2000", help="子行程解析階段的來源數（逗號分隔）")
+    parser.add_argument("--parse-processes", type=int, default=max(2, os.cpu_count() or 1), help="子行程解析階段的行程數")
+    parser.add_argument("--archive-items", type=int, default=20000, help="新聞存檔階段的歷史則數")
+    parser.add_argument("--recipients", type=int, default=50, help="推播階段的收件者數")
+    parser.add_argument("--latency", type=float, default=0.02, help="模擬 feed / LLM / Telegram 回應延遲（秒）")
+    parser.add_argument("--chunk-delay", type=float, default=0.005, help="LLM 串流每段間隔（秒）")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="LLM 與 Telegram 回 429 的比例")
+    parser.add_argument("--json", help="結果另存成 JSON 檔")
+    args = parser.parse_args()
+    runs = args.runs or (5 if args.quick else 30)
+
+    config = MockConfig(
+        feed_latency=args.latency, llm_latency=args.latency, llm_chunk_delay=args.chunk_delay,
+        telegram_latency=args.latency, rate_429=args.rate_429,
+    )
+    with MockServer(config) as server:
+        os.environ.update(server.env())
+        os.environ.update({
+            "TELEGRAM_BOT_TOKEN": "TOKEN", "TELEGRAM_CHAT_ID": "bench",
+            "OPENAI_API_KEY": "sk-bench", "GEMINI_API_KEY": "bench",
+            "IS_MANUAL": "true",          # 不寫入推播記錄，每次執行條件相同
+            "LLM_CACHE": "off",           # 每次都實際呼叫（模擬）API
+            "GEMINI_RPM": "100000", "GEMINI_TPM": "1000000000",
+        })
+        os.chdir(tempfile.mkdtemp(prefix="newsbot-bench-"))
+        news_bot   = importlib.import_module("news_bot")   # LLM_CACHE 等調校參數在建立共用元件時讀取，先設好環境變數
+        gemini_bot = importlib.import_module("news_bot_gemini")
+
+        results  = bench_parse(server, runs)
+        results += bench_parse_pool(server, runs, [int(n) for n in args.parse_feeds.split(",")], args.parse_processes)
+        results += bench_clean(server, runs)
+        results += bench_dates(server, runs)
+        results += bench_blacklist(runs, args.blacklist_rules)
+        results += bench_archive(runs, args.archive_items)
+        results += bench_pipeline(news_bot, gemini_bot, server, runs, args.feeds, args.recipients)
+
+    print_table(results)
+    print(f"\n模擬伺服器請求數：{json.dumps(server.counts, ensure_ascii=False)}")
+    if args.json:
+        with open(os.path.join(ROOT, args.json) if not os.path.isabs(args.json) else args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results, "server_counts": server.counts}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
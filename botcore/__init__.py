@@ -0,0 +1 @@
+"""四個 Bot 共用的基礎元件"""
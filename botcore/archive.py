@@ -0,0 +1,241 @@
+"""
+新聞存檔（SQLite + FTS5 全文索引）
+
+抓到的每則新聞都存下來，之後查詢、每週回顧或排序都不必重新下載 feed（feed 通常只留最近幾十則）：
+  - 每則抓到的新聞（標題、連結、摘要、來源、分類、發布時間）只新增不修改地存進 state/archive.sqlite3，
+    以標題 digest（與 seen_store 相同）去重，同一則新聞重抓不會重複存
+  - FeedFetcher 每個分類抓完寫一次，整個分類一個交易，不是每則新聞各自 commit
+  - 推播成功後 record_digest() 記錄每則新聞出現在哪一天、哪個 Bot 的摘要裡
+  - 標題與摘要建 FTS5 索引，用 trigram 分詞：中文沒有空白分詞，unicode61 會把整句當成一個詞；
+    trigram 查詢詞至少要 3 個字，較短的詞（例如「台積」）改用 LIKE 比對
+  - search() 給 CLI 查詢，items() 依時間範圍取出，給近似重複、排序、每週回顧等功能共用，不必重新下載 feed
+  - 存檔失敗只印警告，不影響推播
+
+查詢：
+  python -m botcore.archive 台積電 --days 90
+  python -m botcore.archive "OpenAI GPT" --category "🤖 AI 新聞" --limit 50
+  python -m botcore.archive --stats
+
+設定（環境變數）：
+  ARCHIVE_PATH  存檔位置（預設 state/archive.sqlite3）
+  ARCHIVE       設為 off 時停用
+"""
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import threading
+from datetime import datetime
+
+from botcore.config import STATE_DIR, TW_TZ
+from botcore.dates import parse_timestamp
+from botcore.seen_store import title_digest
+
+DEFAULT_PATH = os.path.join(STATE_DIR, "archive.sqlite3")
+TRIGRAM      = 3   # trigram 索引能查的最短詞長
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id          INTEGER PRIMARY KEY,
+    key         BLOB NOT NULL UNIQUE,
+    title       TEXT NOT NULL,
+    link        TEXT NOT NULL,
+    description TEXT NOT NULL,
+    source      TEXT NOT NULL,
+    category    TEXT NOT NULL,
+    published   REAL,
+    fetched     REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_time ON items (COALESCE(published, fetched));
+CREATE TABLE IF NOT EXISTS digests (
+    item_id INTEGER NOT NULL REFERENCES items (id),
+    bot     TEXT NOT NULL,
+    date    TEXT NOT NULL,
+    sent    REAL NOT NULL,
+    PRIMARY KEY (item_id, bot, date)
+) WITHOUT ROWID;
+"""
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+    title, description, content='items', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS items_fts_insert AFTER INSERT ON items BEGIN
+    INSERT INTO items_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+END;
+"""
+_COLUMNS = ("title", "link", "description", "source", "category", "published", "fetched")
+
+
+def _fts_phrase(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _like(term: str) -> str:
+    return "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+class Archive:
+    def __init__(self, path: str | None = None):
+        self.path    = path or os.environ.get("ARCHIVE_PATH", DEFAULT_PATH)
+        self.enabled = os.environ.get("ARCHIVE", "on").lower() != "off"
+        self.fts     = True
+        self._db     = None
+        self._lock   = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        # 第一次用到才開檔，import 時不碰檔案系統
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.executescript(_SCHEMA)
+            try:
+                db.executescript(_FTS_SCHEMA)
+            except sqlite3.OperationalError as e:
+                # SQLite 沒編進 FTS5 或版本太舊（trigram 需要 3.34）：照樣存檔，查詢改用 LIKE
+                print(f"⚠️ 新聞存檔無法建立全文索引，查詢改用 LIKE: {e}")
+                self.fts = False
+            self._db = db
+        return self._db
+
+    def add(self, category: str, items: list[dict], fetched: float | None = None) -> int:
+        """一個分類的新聞在同一個交易裡寫入，回傳新增的則數（已存過的略過）"""
+        if not self.enabled or not items:
+            return 0
+        fetched = time.time() if fetched is None else fetched
+        rows = [
+            (title_digest(item["title"]), item["title"], item.get("link", ""), item.get("description", ""),
+             item.get("source", ""), category, parse_timestamp(item.get("published") or ""), fetched)
+            for item in items
+        ]
+        try:
+            with self._lock:
+                db = self._conn()
+                with db:
+                    cur = db.executemany(
+                        "INSERT OR IGNORE INTO items (key, title, link, description, source, category, published, fetched)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        rows,
+                    )
+                return cur.rowcount   # 不含觸發器寫入 FTS 的筆數，也不含已存過而略過的
+        except sqlite3.Error as e:
+            print(f"⚠️ 新聞存檔寫入失敗（{category}）: {e}")
+            return 0
+
+    def record_digest(self, bot: str, news: dict[str, list[dict]], sent: float | None = None):
+        """記錄推播出去的新聞出現在哪一天、哪個 Bot 的摘要裡"""
+        if not self.enabled:
+            return
+        sent = time.time() if sent is None else sent
+        date = datetime.fromtimestamp(sent, TW_TZ).date().isoformat()
+        rows = [(bot, date, sent, title_digest(item["title"])) for items in news.values() for item in items]
+        try:
+            with self._lock:
+                db = self._conn()
+                with db:
+                    db.executemany(
+                        "INSERT OR IGNORE INTO digests (item_id, bot, date, sent)"
+                        " SELECT id, ?, ?, ? FROM items WHERE key = ?",
+                        rows,
+                    )
+        except sqlite3.Error as e:
+            print(f"⚠️ 新聞存檔記錄推播失敗: {e}")
+
+    def _select(self, where: list[str], params: list, join: str = "", order: str = "", limit: int | None = None) -> list[dict]:
+        sql = (
+            f"SELECT {', '.join('items.' + c for c in _COLUMNS)},"
+            " (SELECT group_concat(bot || ' ' || date, ', ') FROM digests WHERE item_id = items.id)"
+            f" FROM items {join}"
+            + (" WHERE " + " AND ".join(where) if where else "")
+            + f" ORDER BY {order or 'COALESCE(items.published, items.fetched) DESC'}"
+            + (" LIMIT ?" if limit else "")
+        )
+        with self._lock:
+            rows = self._conn().execute(sql, params + ([limit] if limit else [])).fetchall()
+        return [dict(zip(_COLUMNS + ("digests",), row)) for row in rows]
+
+    def search(self, query: str, days: float | None = None, category: str | None = None, limit: int = 20) -> list[dict]:
+        """以空白分隔的每個詞都要出現在標題或摘要中；結果依發布時間由新到舊"""
+        where, params, join = [], [], ""
+        with self._lock:
+            self._conn()   # 先開檔：建不了全文索引時 self.fts 在這裡才會變成 False
+        terms = query.split()
+        long  = [term for term in terms if len(term) >= TRIGRAM] if self.fts else []
+        if long:
+            join = "JOIN items_fts ON items_fts.rowid = items.id"
+            where.append("items_fts MATCH ?")
+            params.append(" AND ".join(_fts_phrase(term) for term in long))
+        for term in terms:
+            if term not in long:
+                where.append("(items.title LIKE ? ESCAPE '\\' OR items.description LIKE ? ESCAPE '\\')")
+                params += [_like(term)] * 2
+        if days is not None:
+            where.append("COALESCE(items.published, items.fetched) >= ?")
+            params.append(time.time() - days * 86400)
+        if category:
+            where.append("items.category = ?")
+            params.append(category)
+        return self._select(where, params, join, limit=limit)
+
+    def items(self, since: float, until: float | None = None, category: str | None = None) -> list[dict]:
+        """發布（沒有發布時間的以抓取時間）在 [since, until) 之間的新聞，依時間由舊到新"""
+        where, params = ["COALESCE(items.published, items.fetched) >= ?"], [since]
+        if until is not None:
+            where.append("COALESCE(items.published, items.fetched) < ?")
+            params.append(until)
+        if category:
+            where.append("items.category = ?")
+            params.append(category)
+        return self._select(where, params, order="COALESCE(items.published, items.fetched)")
+
+    def stats(self) -> dict:
+        with self._lock:
+            db = self._conn()
+            items, oldest, newest = db.execute(
+                "SELECT COUNT(*), MIN(COALESCE(published, fetched)), MAX(COALESCE(published, fetched)) FROM items"
+            ).fetchone()
+            digests = db.execute("SELECT COUNT(DISTINCT bot || date) FROM digests").fetchone()[0]
+        return {"items": items, "digests": digests, "oldest": oldest, "newest": newest,
+                "bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0}
+
+
+# 整個程序共用一個存檔
+archive = Archive()
+
+
+def _format_time(ts: float | None) -> str:
+    return datetime.fromtimestamp(ts, TW_TZ).strftime("%Y/%m/%d %H:%M") if ts else "????/??/?? ??:??"
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m botcore.archive", description="查詢新聞存檔")
+    parser.add_argument("query", nargs="?", default="", help="關鍵字，以空白分隔的每個詞都要出現")
+    parser.add_argument("--days", type=float, help="只查最近幾天")
+    parser.add_argument("--category", help="只查某個分類，例如「🤖 AI 新聞」")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--path", help=f"存檔位置（預設 {DEFAULT_PATH}）")
+    parser.add_argument("--stats", action="store_true", help="只印存檔概況")
+    args = parser.parse_args(argv)
+
+    store = Archive(args.path)
+    if not os.path.exists(store.path):
+        print(f"⚠️ 找不到新聞存檔 {store.path}")
+        return 1
+    if args.stats or not args.query:
+        s = store.stats()
+        print(f"🗄️ {store.path}：{s['items']} 則新聞、{s['digests']} 份摘要，{s['bytes'] / 1024 / 1024:.1f} MB")
+        print(f"   {_format_time(s['oldest'])} ～ {_format_time(s['newest'])}")
+        return 0
+
+    start = time.perf_counter()
+    results = store.search(args.query, days=args.days, category=args.category, limit=args.limit)
+    elapsed = time.perf_counter() - start
+    for item in results:
+        print(f"{_format_time(item['published'] or item['fetched'])}  {item['category']}  {item['title']}")
+        print(f"    {item['link']}" + (f"  📤 {item['digests']}" if item["digests"] else ""))
+    print(f"🔎 {len(results)} 筆（{elapsed * 1000:.1f} ms）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+"""
+新聞黑名單（Aho-Corasick 多關鍵字比對）
+
+標題、摘要與連結的關鍵字黑名單，規則數多到上千條也不拖慢解析：
+  - 所有規則建成一個 Aho-Corasick 自動機，比對時間只與文字長度有關，與規則數無關
+  - 除了標題，也能比對摘要與連結；命中時回報是哪一條規則、哪個欄位
+  - 規則可以放在外部檔案（預設 blacklist.txt），與程式內的 TITLE_BLACKLIST 合併
+  - 第一次比對時才讀檔、建自動機，每次執行只建一次；import 與沒有用到黑名單時不花任何時間
+
+規則檔格式（一行一條，# 開頭為註解，英文不分大小寫、全形英數視同半形）：
+  博弈               只比對標題（與 TITLE_BLACKLIST 相同）
+  desc:業配文        只比對摘要
+  link:/sponsored/   只比對連結
+  any:娛樂城         標題、摘要、連結都比對
+
+設定（環境變數）：
+  BLACKLIST_FILE  規則檔位置（預設為專案根目錄的 blacklist.txt，不存在時只用程式內的規則）
+"""
+import os
+import threading
+from collections import Counter, deque
+
+from botcore import metrics
+from botcore.text import normalize_text
+
+DEFAULT_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "blacklist.txt")
+FIELDS       = ("title", "description", "link")
+_SCOPES      = {"title": ("title",), "desc": ("description",), "link": ("link",), "any": FIELDS}
+
+
+class Automaton:
+    """Aho-Corasick：goto 表 + failure link，每個節點的 out 已併入 failure 鏈上的輸出"""
+
+    def __init__(self, patterns: list[str]):
+        self.patterns = patterns
+        self.goto = [{}]
+        self.fail = [0]
+        self.out  = [()]
+        for index, pattern in enumerate(patterns):
+            node = 0
+            for ch in pattern:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(())
+                node = nxt
+            self.out[node] += (index,)
+        # 依 BFS 順序補上 failure link，父節點的 failure 一定先算好
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and ch not in self.goto[state]:
+                    state = self.fail[state]
+                self.fail[child] = self.goto[state].get(ch, 0)
+                self.out[child] += self.out[self.fail[child]]
+
+    def search(self, text: str) -> str | None:
+        """回傳 text 中最早結束的命中規則，沒有命中時回傳 None"""
+        goto, fail, out = self.goto, self.fail, self.out
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                return self.patterns[out[node][0]]
+        return None
+
+
+def parse_rules(lines) -> list[tuple[str, str]]:
+    """規則檔的每一行轉成 (範圍, 關鍵字)；空行與註解略過"""
+    rules = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        scope, sep, keyword = line.partition(":")
+        if sep and scope in _SCOPES and keyword.strip():
+            rules.append((scope, keyword.strip()))
+        else:
+            rules.append(("title", line))
+    return rules
+
+
+class Blacklist:
+    def __init__(self, keywords=(), path: str | None = None):
+        self.keywords = list(keywords)   # 程式內的規則（只比對標題）
+        self.path     = path             # None 時在第一次比對時讀 BLACKLIST_FILE
+        self.hits     = Counter()        # (欄位, 規則) → 命中次數
+        self._fields  = None             # 欄位 → Automaton
+        self._lock    = threading.Lock()
+
+    def _compile(self) -> dict:
+        if self._fields is not None:
+            return self._fields
+        with self._lock:
+            if self._fields is not None:
+                return self._fields
+            rules = [("title", kw) for kw in self.keywords if kw]
+            path  = self.path if self.path is not None else os.environ.get("BLACKLIST_FILE", DEFAULT_FILE)
+            if path and os.path.exists(path):
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        rules += parse_rules(f)
+                except OSError as e:
+                    print(f"⚠️ 無法讀取黑名單 {path}: {e}")
+            by_field = {field: [] for field in FIELDS}
+            for scope, keyword in rules:
+                # 標題與摘要解析時經過 normalize_text（全形英數轉半形），關鍵字也要同樣處理才對得上
+                keyword = normalize_text(keyword).casefold()
+                for field in _SCOPES[scope]:
+                    by_field[field].append(keyword)
+            self._fields = {field: Automaton(list(dict.fromkeys(words))) for field, words in by_field.items() if words}
+            return self._fields
+
+    def __len__(self) -> int:
+        return sum(len(automaton.patterns) for automaton in self._compile().values())
+
+    def match(self, item: dict) -> tuple[str, str] | None:
+        """item 命中黑名單時回傳 (欄位, 規則) 並計入 hits，否則回傳 None"""
+        for field, automaton in self._compile().items():
+            text = item.get(field)
+            if not text:
+                continue
+            rule = automaton.search(text.casefold())
+            if rule is not None:
+                self.record(field, rule)
+                return field, rule
+        return None
+
+    def record(self, field: str, rule: str, count: int = 1):
+        """計入命中次數；子行程解析（FeedFetcher 的 ParsePool）的命中也由這裡併回主行程"""
+        with self._lock:
+            self.hits[(field, rule)] += count
+        metrics.inc("blacklist_hits", count, field=field)
+
+    def summary(self, top: int = 5) -> str:
+        """本次執行命中最多的幾條規則，給 log 用"""
+        ranked = ", ".join(f"{field}:{rule}×{count}" for (field, rule), count in self.hits.most_common(top))
+        return f"{sum(self.hits.values())} 則（{ranked}）"
@@ -0,0 +1,99 @@
+"""
+設定（環境變數，用到時才讀取）
+
+所有 Bot 共用的設定與狀態檔路徑：
+  - settings 的每個屬性都是存取時才讀環境變數，import 之後再設定也有效（例如基準測試指向模擬伺服器）
+  - 缺少必要的環境變數時丟出 MissingSetting，訊息直接指出是哪一個
+  - 跨次執行的狀態檔路徑集中在這裡，新聞 Bot 的兩個版本共用同一份記錄
+"""
+import os
+from datetime import timezone, timedelta
+
+TW_TZ = timezone(timedelta(hours=8))
+
+# 跨次執行的狀態都放在 STATE_DIR，由 GitHub Actions Cache 整個資料夾保留
+STATE_DIR        = "state"
+SEEN_FILE        = os.path.join(STATE_DIR, "seen_titles.bin")   # 已推播標題（固定寬度二進位，FIFO 淘汰）
+LEGACY_SEEN_FILE = "seen_titles.json"                           # 舊版 JSON 格式，第一次執行時自動轉換
+FEED_CACHE_FILE  = os.path.join(STATE_DIR, "feed_cache.json")   # 各來源的 ETag / Last-Modified 與上次解析結果
+NEAR_DUP_FILE    = os.path.join(STATE_DIR, "seen_bands.bin")    # 已推播標題的 LSH band key，跨天抓近似重複
+
+
+class MissingSetting(RuntimeError):
+    def __str__(self) -> str:
+        return f"缺少環境變數 {self.args[0]}"
+
+
+def require(name: str) -> str:
+    value = os.environ.get(name)
+    if not value:
+        raise MissingSetting(name)
+    return value
+
+
+def flag(name: str, default: bool = False) -> bool:
+    return os.environ.get(name, "true" if default else "false").lower() == "true"
+
+
+class Settings:
+    """四個 Bot 用到的環境變數；每次存取都重新讀取，不快取"""
+
+    @property
+    def telegram_bot_token(self) -> str:
+        return require("TELEGRAM_BOT_TOKEN")
+
+    @property
+    def telegram_chat_ids(self) -> list[str]:
+        return [cid.strip() for cid in require("TELEGRAM_CHAT_ID").split(",") if cid.strip()]
+
+    @property
+    def telegram_api_base(self) -> str:
+        return os.environ.get("TELEGRAM_API_BASE", "https://api.telegram.org")
+
+    @property
+    def openai_api_key(self) -> str:
+        return require("OPENAI_API_KEY")
+
+    @property
+    def openai_base_url(self) -> str:
+        return os.environ.get("OPENAI_BASE_URL", "https://api.openai.com/v1")
+
+    @property
+    def gemini_api_key(self) -> str:
+        return require("GEMINI_API_KEY")
+
+    @property
+    def gemini_base_url(self) -> str:
+        return os.environ.get("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta")
+
+    @property
+    def github_pages_url(self) -> str:
+        return os.environ.get("GITHUB_PAGES_URL", "https://你的帳號.github.io/daily-news-bot")
+
+    @property
+    def is_manual(self) -> bool:
+        """手動觸發（workflow_dispatch）時不寫入推播記錄，方便反覆測試"""
+        return flag("IS_MANUAL")
+
+    @property
+    def incremental(self) -> bool:
+        """一天多版（早報、午報、晚報）：每個來源只處理上一版之後的新新聞（botcore.high_water）"""
+        return flag("INCREMENTAL")
+
+    @property
+    def edition(self) -> str:
+        """版次名稱（例如「午報」），顯示在推播標題；沒設定時不顯示"""
+        return os.environ.get("EDITION", "").strip()
+
+    @property
+    def telegram_preferences(self) -> str:
+        """各收件者要看的分類，例如 "111=AI,財經;222=台灣,國際"（botcore.subscribers），沒列出的收件者看全部"""
+        return os.environ.get("TELEGRAM_PREFERENCES", "")
+
+    @property
+    def prompt_token_budget(self) -> int:
+        """每個分類送給 LLM 的新聞內容上限（估算 token）"""
+        return int(os.environ.get("PROMPT_TOKEN_BUDGET", "2000"))
+
+
+settings = Settings()
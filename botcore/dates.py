@@ -0,0 +1,133 @@
+"""
+新聞日期解析與日期過濾
+
+RSS / Atom 發布時間的解析，以及每次執行共用的日期範圍：
+  - parse_timestamp：RFC 2822（RSS）與 ISO 8601（Atom）各有一條正規表示式的快速路徑，直接以
+    calendar.timegm 算出 epoch 秒數；格式不合才退回標準函式庫。結果以 LRU 快取，同一個時間字串只解析一次
+  - DateWindow：每次執行只算一次「現在」與台灣時間今天的起訖，之後每則新聞只是數字比較
+  - 每個來源可設定回溯時間（lookback，例如 "24h"）：美國來源早上跑時日期還是昨天，
+    保留最近 24 小時，既不漏掉美國時間昨晚的新聞，也不會混進好幾天前的舊文
+沒有日期或無法解析的新聞一律保留，不誤殺。
+"""
+import re
+import time
+import calendar
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+
+from botcore.config import TW_TZ
+
+_MONTHS = {m: i for i, m in enumerate(("jan", "feb", "mar", "apr", "may", "jun",
+                                       "jul", "aug", "sep", "oct", "nov", "dec"), 1)}
+_ZONES  = {"gmt": 0, "ut": 0, "utc": 0, "z": 0, "est": -5, "edt": -4, "cst": -6, "cdt": -5,
+           "mst": -7, "mdt": -6, "pst": -8, "pdt": -7}
+_RFC_RE = re.compile(
+    r"(?:[A-Za-z]{3},\s*)?(\d{1,2})\s+([A-Za-z]{3})[a-z]*\s+(\d{2,4})\s+"
+    r"(\d{1,2}):(\d{2})(?::(\d{2}))?\s*([+-]\d{4}|[A-Za-z]{1,3})?\s*$"
+)
+_ISO_RE = re.compile(
+    r"(\d{4})-(\d{2})-(\d{2})(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:\.\d+)?)?)?\s*(Z|[+-]\d{2}:?\d{2})?$",
+    re.IGNORECASE,
+)
+_TW_OFFSET = 8 * 3600   # 沒有時區的時間視為台灣時間
+
+
+def _offset(zone: str | None) -> int | None:
+    if not zone:
+        return _TW_OFFSET
+    if zone[0] in "+-":
+        digits = zone[1:].replace(":", "")
+        seconds = int(digits[:2]) * 3600 + int(digits[2:4]) * 60
+        return -seconds if zone[0] == "-" else seconds
+    hours = _ZONES.get(zone.lower())
+    return None if hours is None else hours * 3600
+
+
+def _timegm(year: int, month: int, day: int, hour: int, minute: int, second: int) -> float | None:
+    """timegm 不檢查範圍（2 月 30 日會變成 3 月 2 日），先自己檢查"""
+    if not (1 <= month <= 12 and 1 <= day <= calendar.monthrange(year, month)[1]
+            and hour < 24 and minute < 60 and second <= 60):
+        return None
+    return calendar.timegm((year, month, day, hour, minute, second))
+
+
+def _rfc2822(text: str) -> float | None:
+    m = _RFC_RE.match(text)
+    if not m:
+        return None
+    day, month, year, hour, minute, second, zone = m.groups()
+    month  = _MONTHS.get(month.lower())
+    offset = _offset(zone)
+    if month is None or offset is None:
+        return None
+    year = int(year)
+    if year < 100:
+        year += 2000 if year < 50 else 1900
+    ts = _timegm(year, month, int(day), int(hour), int(minute), int(second or 0))
+    return None if ts is None else ts - offset
+
+
+def _iso8601(text: str) -> float | None:
+    m = _ISO_RE.match(text)
+    if not m:
+        return None
+    year, month, day, hour, minute, second, zone = m.groups()
+    ts = _timegm(int(year), int(month), int(day), int(hour or 0), int(minute or 0), int(second or 0))
+    return None if ts is None else ts - _offset(zone)
+
+
+def _fallback(text: str) -> float | None:
+    try:
+        dt = parsedate_to_datetime(text)
+    except (TypeError, ValueError, IndexError):
+        try:
+            dt = datetime.fromisoformat(text.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    return (dt if dt.tzinfo else dt.replace(tzinfo=TW_TZ)).timestamp()
+
+
+@lru_cache(maxsize=4096)
+def parse_timestamp(text: str) -> float | None:
+    """RSS / Atom 的日期字串轉成 epoch 秒數，無法解析時回傳 None"""
+    text = text.strip()
+    if not text:
+        return None
+    ts = _iso8601(text) if text[:1].isdigit() and "-" in text[:5] else _rfc2822(text)
+    return ts if ts is not None else _fallback(text)
+
+
+def parse_lookback(value) -> float | None:
+    """"24h"、"2d"、"90m" 或小時數（數字）轉成秒數；None 代表只保留台灣時間今天"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value) * 3600
+    m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([dhm])\s*", str(value).lower())
+    if not m:
+        raise ValueError(f"無法解析的回溯時間：{value!r}（例如 24h、2d、90m）")
+    return float(m.group(1)) * {"d": 86400, "h": 3600, "m": 60}[m.group(2)]
+
+
+class DateWindow:
+    """固定一次執行的「現在」；accepts() 判斷新聞日期是否在今天（或回溯時間）內"""
+
+    def __init__(self, now: float | None = None):
+        self.now   = time.time() if now is None else now
+        today      = datetime.fromtimestamp(self.now, TW_TZ).replace(hour=0, minute=0, second=0, microsecond=0)
+        self.start = today.timestamp()
+        self.end   = (today + timedelta(days=1)).timestamp()
+        self.date  = today.date().isoformat()
+
+    def accepts(self, pub_date: str, lookback: float | None = None) -> bool:
+        ts = parse_timestamp(pub_date) if pub_date else None
+        if ts is None:
+            return True
+        if lookback is not None:
+            return ts >= self.now - lookback
+        return self.start <= ts < self.end
+
+    def for_feed(self, lookback: float | None = None):
+        """單一來源用的過濾函式：pub_date → bool"""
+        return lambda pub_date: self.accepts(pub_date, lookback)
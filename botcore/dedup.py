@@ -0,0 +1,184 @@
+"""
+近似重複新聞分群（MinHash + LSH）
+
+同一事件常被自由時報、ETtoday、聯合報用略為不同的標題各報一次，title_hash 只能抓到一字不差的重複。
+這裡在 fetch_all_news 之後、組 prompt 之前：
+  - 標題正規化後切成字元 n-gram（中文用 2-gram，英文用 3-gram），計算 64 個 MinHash
+  - 同一次執行內：16 個 band × 4 row 的 LSH 找候選，再以實際 Jaccard 相似度確認，
+    相似的新聞併成一群，只送第一則（依 feeds.toml 的分類與來源順序）給 LLM，並記下有幾家媒體報導
+  - StreamClusterer 是逐分類加入的版本：分類一抓完就能先分群、先送摘要，先到的新聞當代表
+  - 跨天：另外取 8 個 band × 8 row 的 band key（門檻較嚴，避免誤殺），存進 SeenStore；
+    今天的新聞只要有任何一個 band key 出現在過去已推播的記錄中，就視為同一事件的後續重複報導
+"""
+import re
+import random
+import hashlib
+import unicodedata
+
+from botcore.seen_store import SeenStore
+
+NUM_PERM       = 64
+CLUSTER_BANDS  = 16    # 同次執行分群用：門檻約 (1/16)^(1/4) ≈ 0.5，之後再用 Jaccard 確認
+CLUSTER_ROWS   = 4
+HISTORY_BANDS  = 8     # 跨天比對用：門檻約 (1/8)^(1/8) ≈ 0.77，只抓幾乎相同的標題
+HISTORY_ROWS   = 8
+JACCARD_THRESHOLD = 0.5
+HISTORY_CAPACITY  = 24_000   # 每則標題佔 HISTORY_BANDS 筆，約保留最近 3000 則
+
+_PRIME = (1 << 61) - 1
+_rng   = random.Random(20240224)   # 固定種子：跨天存下來的 band key 才比得起來
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+_STRIP_RE = re.compile(r"[\W_]+", re.UNICODE)
+_CJK_RE   = re.compile(r"[㐀-鿿豈-﫿]")
+
+
+def normalize_title(title: str) -> str:
+    """全形轉半形、轉小寫、去掉標點與空白"""
+    return _STRIP_RE.sub("", unicodedata.normalize("NFKC", title).lower())
+
+
+def shingles(title: str) -> set[str]:
+    text = normalize_title(title)
+    n = 2 if _CJK_RE.search(text) else 3
+    if len(text) <= n:
+        return {text} if text else set()
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def minhash(grams: set[str]) -> tuple[int, ...]:
+    if not grams:
+        return (0,) * NUM_PERM
+    base = [int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest(), "little") for g in grams]
+    return tuple(min((a * h + b) % _PRIME for h in base) for a, b in _PERMS)
+
+
+def band_keys(signature: tuple[int, ...], bands: int, rows: int) -> list[bytes]:
+    """把簽章切成 bands 段，每段雜湊成 8 bytes（段落編號也算進去，不同段不會互撞）"""
+    keys = []
+    for band in range(bands):
+        chunk = signature[band * rows:(band + 1) * rows]
+        keys.append(hashlib.blake2b(repr((band, chunk)).encode(), digest_size=8).digest())
+    return keys
+
+
+def jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def load_history(path: str) -> SeenStore:
+    return SeenStore.load(path, capacity=HISTORY_CAPACITY)
+
+
+def cluster_news(all_news: dict[str, list[dict]], history: SeenStore | None = None,
+                 threshold: float = JACCARD_THRESHOLD) -> tuple[dict[str, list[dict]], dict]:
+    """
+    回傳 (分群後的新聞, 統計)。每群只保留第一則，並在該則加上 duplicates（同群的其他報導數）。
+    history 不為 None 時，先排除與過去已推播新聞幾乎相同的標題
+    """
+    entries = []   # (分類, 新聞, n-gram, 簽章)
+    history_hits = 0
+    for category, items in all_news.items():
+        for item in items:
+            grams = shingles(item["title"])
+            sig   = minhash(grams)
+            if history is not None and any(k in history for k in band_keys(sig, HISTORY_BANDS, HISTORY_ROWS)):
+                history_hits += 1
+                continue
+            entries.append((category, item, grams, sig))
+
+    # LSH：同一個 band key 的新聞互為候選，確認相似後以 union-find 併群
+    parent = list(range(len(entries)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    buckets = {}
+    for idx, (_, _, grams, sig) in enumerate(entries):
+        for key in band_keys(sig, CLUSTER_BANDS, CLUSTER_ROWS):
+            for other in buckets.setdefault(key, []):
+                root_a, root_b = find(idx), find(other)
+                if root_a != root_b and jaccard(grams, entries[other][2]) >= threshold:
+                    parent[max(root_a, root_b)] = min(root_a, root_b)   # 較早出現的當代表
+            buckets[key].append(idx)
+
+    sizes = {}
+    for idx in range(len(entries)):
+        root = find(idx)
+        sizes[root] = sizes.get(root, 0) + 1
+
+    clustered = {category: [] for category in all_news}
+    for idx, (category, item, _, _) in enumerate(entries):
+        if find(idx) != idx:
+            continue
+        rep = dict(item)
+        if sizes[idx] > 1:
+            rep["duplicates"] = sizes[idx] - 1
+        clustered[category].append(rep)
+
+    stats = {
+        "input":        sum(len(items) for items in all_news.values()),
+        "history_hits": history_hits,
+        "clusters":     sum(1 for size in sizes.values() if size > 1),
+        "merged":       sum(size - 1 for size in sizes.values()),
+    }
+    return clustered, stats
+
+
+class StreamClusterer:
+    """cluster_news 的逐批版本，統計欄位相同；後到的相似新聞併入先前的群組（代表已送出時只計數）"""
+
+    def __init__(self, history: SeenStore | None = None, threshold: float = JACCARD_THRESHOLD):
+        self.history   = history
+        self.threshold = threshold
+        self.buckets   = {}   # band key → members 的索引
+        self.members   = []   # (n-gram, 所屬群組的代表在 reps 中的索引)
+        self.reps      = []
+        self.stats     = {"input": 0, "history_hits": 0, "clusters": 0, "merged": 0}
+
+    def _match(self, grams: set[str], keys: list[bytes]) -> int | None:
+        for key in keys:
+            for member in self.buckets.get(key, ()):
+                member_grams, rep = self.members[member]
+                if jaccard(grams, member_grams) >= self.threshold:
+                    return rep
+        return None
+
+    def add(self, items: list[dict]) -> list[dict]:
+        """加入一批新聞，回傳其中新出現的代表（與先前重複的已併入舊群組）"""
+        self.stats["input"] += len(items)
+        fresh = []
+        for item in items:
+            grams = shingles(item["title"])
+            sig   = minhash(grams)
+            if self.history is not None and any(k in self.history for k in band_keys(sig, HISTORY_BANDS, HISTORY_ROWS)):
+                self.stats["history_hits"] += 1
+                continue
+            keys = band_keys(sig, CLUSTER_BANDS, CLUSTER_ROWS)
+            rep  = self._match(grams, keys)
+            if rep is None:
+                rep = len(self.reps)
+                self.reps.append(dict(item))
+                fresh.append(self.reps[rep])
+            else:
+                dup = self.reps[rep]["duplicates"] = self.reps[rep].get("duplicates", 0) + 1
+                self.stats["clusters"] += dup == 1
+                self.stats["merged"]   += 1
+            # 每個成員都留下 band key，與群組中任何一則相似的新聞都能併入
+            for key in keys:
+                self.buckets.setdefault(key, []).append(len(self.members))
+            self.members.append((grams, rep))
+        return fresh
+
+
+def remember(all_news: dict[str, list[dict]], history: SeenStore):
+    """把本次推播的新聞加入跨天比對記錄"""
+    for items in all_news.values():
+        for item in items:
+            for key in band_keys(minhash(shingles(item["title"])), HISTORY_BANDS, HISTORY_ROWS):
+                history.add(key)
@@ -0,0 +1,109 @@
+"""
+來源健康狀態：延遲百分位數、錯誤統計與斷路器
+
+每個來源的耗時與成敗記錄，用來決定 timeout 與是否略過：
+  - 每個來源保留最近 LATENCY_WINDOW 次的耗時與成功 / 失敗次數，存在 feed_cache.json（每個來源的 "health"），跨次執行累積
+  - timeout 依該來源自己的 p95 × TIMEOUT_FACTOR 決定（夾在 TIMEOUT_MIN～TIMEOUT_MAX 之間），樣本不足時用 TIMEOUT_MAX
+  - 連續失敗 FAILURE_THRESHOLD 次就打開斷路器：之後的執行直接略過，不連線；
+    過了退避時間（BACKOFF_BASE 起每次加倍，最長 BACKOFF_MAX）才放行一次試探，成功就恢復，失敗就再退避
+  - summary() 產生給 log 用的健康摘要
+
+設定（環境變數）：
+  FEED_FAILURE_THRESHOLD  連續失敗幾次打開斷路器（預設 3）
+  FEED_TIMEOUT_MAX        timeout 上限與樣本不足時的預設值（預設 15 秒）
+"""
+import os
+import time
+import threading
+from datetime import datetime
+
+from botcore.config import TW_TZ
+
+LATENCY_WINDOW   = 20          # 每個來源保留最近幾次的耗時
+MIN_SAMPLES      = 5           # 樣本數不到這個數量前用預設 timeout
+TIMEOUT_FACTOR   = 3.0         # timeout = p95 × 3，給偶爾變慢的來源一些餘裕
+TIMEOUT_MIN      = 3.0
+BACKOFF_BASE     = 12 * 3600   # 第一次熔斷後隔 12 小時再試（每天跑一次的話就是隔天）
+BACKOFF_MAX      = 7 * 86400
+SLOW_P95         = 2.0         # p95 超過幾秒才列進健康摘要
+
+
+class CircuitOpen(Exception):
+    """斷路器打開中，這次執行略過該來源"""
+
+    def __init__(self, failures: int, retry_at: float):
+        self.failures = failures
+        self.retry_at = retry_at
+        retry = datetime.fromtimestamp(retry_at, TW_TZ).strftime("%m/%d %H:%M")
+        super().__init__(f"連續失敗 {failures} 次，斷路器打開中（{retry} 後重試）")
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(q * (len(ordered) - 1)))]
+
+
+class HealthTracker:
+    """一次執行用一個；狀態直接讀寫 feed_cache[url]["health"]，隨 save_feed_cache 一起保存"""
+
+    def __init__(self, feed_cache: dict, now: float | None = None,
+                 failure_threshold: int | None = None, timeout_max: float | None = None):
+        self.feed_cache        = feed_cache
+        self.now               = time.time() if now is None else now
+        self.failure_threshold = failure_threshold or int(os.environ.get("FEED_FAILURE_THRESHOLD", "3"))
+        self.timeout_max       = timeout_max or float(os.environ.get("FEED_TIMEOUT_MAX", "15"))
+        self._lock             = threading.Lock()
+
+    def state(self, url: str) -> dict:
+        # feed_cache[url] 在抓取成功時會整個換掉，每次都重新取，不持有舊的 dict
+        with self._lock:
+            return self.feed_cache.setdefault(url, {}).setdefault("health", {
+                "latencies": [], "successes": 0, "errors": 0, "failures": 0, "opened": 0, "retry_at": 0,
+            })
+
+    def check(self, url: str):
+        """斷路器打開且還沒到試探時間時丟出 CircuitOpen"""
+        health = self.state(url)
+        if health["failures"] >= self.failure_threshold and self.now < health["retry_at"]:
+            raise CircuitOpen(health["failures"], health["retry_at"])
+
+    def timeout(self, url: str) -> float:
+        latencies = self.state(url)["latencies"]
+        if len(latencies) < MIN_SAMPLES:
+            return self.timeout_max
+        return min(self.timeout_max, max(TIMEOUT_MIN, percentile(latencies, 0.95) * TIMEOUT_FACTOR))
+
+    def record_success(self, url: str, seconds: float):
+        health = self.state(url)
+        health["latencies"] = (health["latencies"] + [round(seconds, 3)])[-LATENCY_WINDOW:]
+        health["successes"] += 1
+        health["failures"]   = 0
+        health["opened"]     = 0
+        health["retry_at"]   = 0
+        health.pop("last_error", None)
+
+    def record_failure(self, url: str, seconds: float, error: Exception):
+        health = self.state(url)
+        health["errors"]    += 1
+        health["failures"]  += 1
+        health["last_error"] = str(error)[:200]
+        if health["failures"] >= self.failure_threshold:
+            # 剛打開或試探又失敗：退避時間加倍
+            backoff = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** health["opened"])
+            health["opened"]  += 1
+            health["retry_at"] = self.now + backoff
+
+    def summary(self, urls: list[str]) -> list[str]:
+        """給 log 用：整體概況一行，加上熔斷中與偏慢的來源"""
+        states  = {url: self.state(url) for url in urls}
+        opened  = [url for url, h in states.items() if h["failures"] >= self.failure_threshold]
+        flaky   = [url for url, h in states.items() if 0 < h["failures"] < self.failure_threshold]
+        slow    = {url: p95 for url, h in states.items() if h["latencies"] and (p95 := percentile(h["latencies"], 0.95)) >= SLOW_P95}
+        lines   = [f"🩺 來源健康：{len(urls) - len(opened) - len(flaky)} 個正常、{len(flaky)} 個最近失敗、{len(opened)} 個熔斷中"]
+        for url in opened:
+            h = states[url]
+            retry = datetime.fromtimestamp(h["retry_at"], TW_TZ).strftime("%m/%d %H:%M")
+            lines.append(f"  ⛔ {url}：連續失敗 {h['failures']} 次，{retry} 後重試（{h.get('last_error', '')}）")
+        for url in sorted(slow, key=slow.get, reverse=True)[:3]:
+            lines.append(f"  🐢 {url}：p95 {slow[url]:.1f} 秒，timeout {self.timeout(url):.1f} 秒")
+        return lines
@@ -0,0 +1,456 @@
+"""
+RSS / Atom 抓取與解析（news_bot、news_bot_gemini 共用）
+
+  - parse_rss：邊下載邊解析（XMLPullParser），湊滿 final_items 則或掃過 max_items 則就停止讀取，
+    處理完的節點立即釋放；XML 中途損毀時回傳已解析的部分
+    標題與摘要經 botcore.text 正規化（去 HTML、解碼實體、全形英數轉半形）
+  - FeedFetcher：平行抓取（同一網站的連線數上限、整體時限），以 ETag / Last-Modified 條件式抓取，
+    某個分類的來源全部抓完就先產出，不必等其他分類；timeout 依各來源的 p95，連續失敗的來源由斷路器略過；
+    增量模式只處理各來源高水位之後的新聞，碰到處理過的就停止解析（botcore.high_water）；
+    有給 archive 時每個分類抓完就一次寫進新聞存檔（botcore.archive）
+  - ParsePool：設定 PARSE_PROCESSES 後，來源很多時（預設 200 個以上）改由子行程解析，避開 GIL；
+    子行程只回傳精簡的 tuple 與黑名單命中數，少量資料傳回主行程。預設關閉：子行程要整份下載完才解析，
+    失去邊讀邊停的好處，目前的基準測試（單核心）也比執行緒內解析慢約 3～4 倍，要在多核心機器量過再開
+  - load_feed_cache / save_feed_cache：條件式抓取用的快取檔，也存各來源的健康狀態（botcore.feed_health）
+
+設定（環境變數）：
+  PARSE_PROCESSES       子行程數（預設 1：一律在執行緒內解析；2 以上才會啟用子行程）
+  PARSE_POOL_MIN_FEEDS  來源數達到多少才改用子行程（預設 200）
+
+FeedSources 描述「抓哪些來源、各來源的回溯時間（botcore.dates）、則數上限與最短輪詢間隔、黑名單（botcore.blacklist）」，
+通常由 feeds.toml 產生（botcore.registry）；解析器與 HTTP 用戶端都可以替換（FeedFetcher(sources, parser=..., client=...)）。
+"""
+import io
+import os
+import json
+import time
+import threading
+import multiprocessing
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeout
+from dataclasses import dataclass, field
+from urllib.error import HTTPError
+from urllib.parse import urlparse
+
+from botcore import high_water, metrics
+from botcore.blacklist import Blacklist
+from botcore.config import FEED_CACHE_FILE
+from botcore.dates import DateWindow, parse_lookback
+from botcore.feed_health import CircuitOpen, HealthTracker
+from botcore.http_pool import client as http_client
+from botcore.seen_store import SeenStore, filter_seen
+from botcore.text import clean_html, normalize_text
+
+MAX_ITEMS_PER_FEED       = 20          # 多抓一些，過濾日期後再限制數量
+MAX_ITEMS_PER_FEED_FINAL = 5           # 過濾後每個來源最多保留幾則
+FEED_CHUNK_SIZE          = 16 * 1024   # 每次從 socket 讀取的大小，邊讀邊解析
+
+PARSE_POOL_MIN_FEEDS     = 200         # 來源數達到這個數量才改用子行程解析（行程啟動與傳輸有固定成本）
+
+ATOM_NS     = {"atom": "http://www.w3.org/2005/Atom"}
+ATOM_ENTRY  = "{http://www.w3.org/2005/Atom}entry"
+ITEM_FIELDS = ("title", "link", "description", "published")   # 子行程回傳 tuple 的欄位順序
+
+# fetch_feed 回傳的來源狀態
+FETCHED      = "fetched"        # 實際下載並解析
+NOT_MODIFIED = "not_modified"   # 伺服器回 304，沿用上次的結果
+POLL_SKIPPED = "poll_skipped"   # 未到最短輪詢間隔，不連線，沿用上次的結果
+CIRCUIT_OPEN = "circuit_open"   # 斷路器打開中，不連線，這次沒有新聞
+
+
+@dataclass
+class FeedSources:
+    feeds: dict[str, list[str]]                           # 分類 → feed 網址（順序即推播與 prompt 的優先順序）
+    lookback: dict[str, str | float] = field(default_factory=dict)   # feed 網址 → 回溯時間（"24h"），沒列出的用 default_lookback
+    blacklist: Blacklist | list[str] = field(default_factory=list)   # 關鍵字清單會與 BLACKLIST_FILE 合併成 Blacklist
+    default_lookback: str | float | None = None           # None：只保留台灣時間今天的新聞
+    item_caps: dict[str, int] = field(default_factory=dict)              # feed 網址 → 最多保留幾則，沒列出的用 MAX_ITEMS_PER_FEED_FINAL
+    poll_interval: dict[str, str | float] = field(default_factory=dict)  # feed 網址 → 最短輪詢間隔（"48h"），間隔內沿用上次結果
+
+    def __post_init__(self):
+        # 設定寫錯時在啟動就報錯，不要等到抓完才發現
+        self.lookback         = {url: parse_lookback(value) for url, value in self.lookback.items()}
+        self.default_lookback = parse_lookback(self.default_lookback)
+        self.poll_interval    = {url: parse_lookback(value) for url, value in self.poll_interval.items() if value}
+        if not isinstance(self.blacklist, Blacklist):
+            self.blacklist = Blacklist(self.blacklist)
+
+
+# ─── 條件式抓取快取（ETag / Last-Modified）──────────────────────────────────────
+def load_feed_cache(path: str = FEED_CACHE_FILE) -> dict:
+    """讀取各來源上次的 HTTP 驗證資訊與解析結果，key 為 feed 網址"""
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            pass
+    return {}
+
+
+def save_feed_cache(cache: dict, path: str = FEED_CACHE_FILE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False)
+
+
+def conditional_headers(entry: dict) -> dict:
+    """根據快取組出 If-None-Match / If-Modified-Since，來源沒更新時伺服器會回 304"""
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+# ─── 解析 ─────────────────────────────────────────────────────────────────────
+def read_chunks(resp, size: int = FEED_CHUNK_SIZE):
+    """把 response 切成固定大小的區塊逐一讀取，停止迭代就不再從 socket 讀資料"""
+    return iter(lambda: resp.read(size), b"")
+
+
+def _position(elem) -> tuple[str, str]:
+    """RSS <item> / Atom <entry> 的 (連結, 發布日期字串)，判斷是否碰到高水位用"""
+    if elem.tag == "item":
+        return elem.findtext("link", "").strip(), elem.findtext("pubDate", "").strip()
+    link_el = elem.find("atom:link", ATOM_NS)
+    pub     = elem.findtext("atom:published", "", ATOM_NS) or elem.findtext("atom:updated", "", ATOM_NS)
+    return (link_el.get("href", "") if link_el is not None else ""), pub.strip()
+
+
+def _allowed(item: dict, blacklist: Blacklist | None) -> dict | None:
+    if not item["title"] or (blacklist is not None and blacklist.match(item)):
+        return None
+    return item
+
+
+def rss_item_to_dict(item, date_filter=None, blacklist: Blacklist | None = None) -> dict | None:
+    """RSS 2.0 的 <item> 轉成 dict，不在日期範圍內或命中黑名單時回傳 None"""
+    pub_date = item.findtext("pubDate", "").strip()
+    if date_filter is not None and not date_filter(pub_date):
+        return None
+    title = normalize_text(item.findtext("title", ""))
+    link  = item.findtext("link", "").strip()
+    desc  = clean_html(item.findtext("description", ""))
+    return _allowed({"title": title, "link": link, "description": desc, "published": pub_date}, blacklist)
+
+
+def atom_entry_to_dict(entry, date_filter=None, blacklist: Blacklist | None = None) -> dict | None:
+    """Atom 的 <entry> 轉成 dict（日期是 ISO 8601），不在日期範圍內或命中黑名單時回傳 None"""
+    pub_date = (
+        entry.findtext("atom:published", "", ATOM_NS)
+        or entry.findtext("atom:updated", "", ATOM_NS)
+    ).strip()
+    if date_filter is not None and not date_filter(pub_date):
+        return None
+    title   = normalize_text(entry.findtext("atom:title", "", ATOM_NS))
+    link_el = entry.find("atom:link", ATOM_NS)
+    link    = link_el.get("href", "") if link_el is not None else ""
+    desc    = clean_html(entry.findtext("atom:summary", "", ATOM_NS))
+    return _allowed({"title": title, "link": link, "description": desc, "published": pub_date}, blacklist)
+
+
+def parse_rss(chunks, max_items: int = MAX_ITEMS_PER_FEED, date_filter=None, *,
+              final_items: int = MAX_ITEMS_PER_FEED_FINAL, blacklist: Blacklist | None = None,
+              stop=None) -> list[dict]:
+    """
+    邊下載邊解析 RSS / Atom，chunks 是 bytes 區塊的 iterable（通常是 read_chunks(resp)）。
+    date_filter(發布日期字串) → bool，None 時不過濾日期（通常是 DateWindow.for_feed(...)）。
+    收集到 final_items 則或掃過 max_items 則就停止讀取，剩下的內容不必再下載；
+    stop(連結, 發布日期字串) 為 True 時（增量模式碰到高水位，high_water.stopper）也立即停止
+    """
+    items, scanned = [], 0
+    parser = ET.XMLPullParser(events=("start", "end"))
+    stack  = []   # 目前開啟中的節點，用來找到父節點把處理完的 item 移除
+    try:
+        for chunk in chunks:
+            parser.feed(chunk)
+            for event, elem in parser.read_events():
+                if event == "start":
+                    stack.append(elem)
+                    continue
+                stack.pop()
+                if elem.tag in ("item", ATOM_ENTRY) and stop is not None and stop(*_position(elem)):
+                    return items
+                if elem.tag == "item":
+                    item = rss_item_to_dict(elem, date_filter, blacklist)
+                elif elem.tag == ATOM_ENTRY:
+                    item = atom_entry_to_dict(elem, date_filter, blacklist)
+                else:
+                    continue
+                scanned += 1
+                if item:
+                    items.append(item)
+                if stack:
+                    stack[-1].remove(elem)
+                if scanned >= max_items or len(items) >= final_items:
+                    return items
+    except ET.ParseError:
+        pass
+    return items
+
+
+# ─── 子行程解析 ───────────────────────────────────────────────────────────────
+_worker_blacklist: Blacklist | None = None   # 每個子行程各自建一份（自動機不必跨行程傳送）
+
+
+def _init_worker(keywords: list[str], path: str | None):
+    global _worker_blacklist
+    _worker_blacklist = Blacklist(keywords, path)
+
+
+def _parse_worker(parser, data: bytes, now: float, lookback: float | None,
+                  final_items: int, mark: dict | None = None) -> tuple[list[tuple], list[tuple]]:
+    """在子行程解析一個來源，回傳 (新聞 tuple, 黑名單命中 (欄位, 規則, 次數))"""
+    _worker_blacklist.hits.clear()   # 子行程一次只處理一個來源，只回報這次的命中
+    items = parser(read_chunks(io.BytesIO(data)), date_filter=DateWindow(now).for_feed(lookback),
+                   final_items=final_items, blacklist=_worker_blacklist, stop=high_water.stopper(mark))
+    hits  = [(field, rule, count) for (field, rule), count in _worker_blacklist.hits.items()]
+    return [tuple(item[key] for key in ITEM_FIELDS) for item in items], hits
+
+
+class ParsePool:
+    """把下載好的 feed 交給子行程解析；parser 必須是模組層級的函式（子行程以名稱載入）"""
+
+    def __init__(self, processes: int, parser, blacklist: Blacklist):
+        self.processes = processes
+        self.parser    = parser
+        self.blacklist = blacklist
+        self.executor  = ProcessPoolExecutor(
+            processes,
+            mp_context=multiprocessing.get_context("spawn"),   # 主行程有抓取執行緒在跑，fork 可能複製到鎖住的鎖
+            initializer=_init_worker,
+            initargs=(blacklist.keywords, blacklist.path),
+        )
+
+    def parse(self, data: bytes, now: float, lookback: float | None,
+              final_items: int = MAX_ITEMS_PER_FEED_FINAL, mark: dict | None = None) -> list[dict]:
+        """mark 是增量模式的高水位（不能傳 stop 函式本身：閉包無法送進子行程）"""
+        rows, hits = self.executor.submit(_parse_worker, self.parser, data, now, lookback, final_items, mark).result()
+        for name, rule, count in hits:
+            self.blacklist.record(name, rule, count)
+        return [dict(zip(ITEM_FIELDS, row)) for row in rows]
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+# ─── 平行抓取 ─────────────────────────────────────────────────────────────────
+def _detach(entry: dict) -> dict:
+    """給 worker 的快取副本：fetch_feed 只會原地修改最上層與 "health"，新聞清單不必複製"""
+    entry = dict(entry)
+    if "health" in entry:
+        entry["health"] = dict(entry["health"])
+    return entry
+
+
+class FeedFetcher:
+    def __init__(self, sources: FeedSources, *, parser=parse_rss, client=None,
+                 max_workers: int = 8, per_host: int = 2, deadline: float = 60,
+                 parse_processes: int | None = None, pool_min_feeds: int | None = None, archive=None):
+        self.sources     = sources
+        self.parser      = parser        # parser(chunks, date_filter=..., final_items=..., blacklist=..., stop=...) → list[dict]
+        self.client      = client or http_client
+        self.max_workers = max_workers   # 同時抓取的來源數
+        self.per_host    = per_host      # 同一網站同時連線數上限（自由時報有 4 個 feed，避免被擋）
+        self.deadline    = deadline      # 整體抓取時限（秒），逾時的來源直接放棄，不拖累整個排程
+        self.archive     = archive       # botcore.archive.Archive，None 代表不存檔
+        # 同時在解析的來源最多 max_workers 個，子行程再多也用不到
+        self.parse_processes = min(max_workers, parse_processes if parse_processes is not None
+                                   else int(os.environ.get("PARSE_PROCESSES", "1")))
+        self.pool_min_feeds  = pool_min_feeds or int(os.environ.get("PARSE_POOL_MIN_FEEDS", PARSE_POOL_MIN_FEEDS))
+
+    def use_pool(self, feed_count: int) -> bool:
+        """沒有設定 PARSE_PROCESSES（預設）時不用；來源少時子行程的啟動成本比省下的解析時間多"""
+        return self.parse_processes > 1 and feed_count >= self.pool_min_feeds
+
+    def fetch_feed(self, feed_url: str, host_limits: dict, feed_cache: dict,
+                   seen: SeenStore | None = None, window: DateWindow | None = None,
+                   parse_pool: ParsePool | None = None, health: HealthTracker | None = None,
+                   incremental: bool = False) -> tuple[list[dict], Exception | None, float, str]:
+        """
+        抓取並解析單一來源，回傳 (新聞, 錯誤, 耗時秒數, 來源狀態 FETCHED / NOT_MODIFIED / POLL_SKIPPED / CIRCUIT_OPEN)。
+        有給 seen 時過濾掉已推播過的新聞；快取存的是過濾前的結果，手動測試與自動排程共用。
+        window 是整次執行共用的日期範圍，沒給時以現在時間建立；有給 parse_pool 時交給子行程解析。
+        斷路器打開中的來源不連線，直接回傳 CircuitOpen 錯誤；未到最短輪詢間隔的來源也不連線，沿用上次的結果。
+        incremental 為 True 時只回傳高水位之後的新聞，並記下這次處理到的位置（待 high_water.commit）
+        """
+        window = window or DateWindow()
+        health = health or HealthTracker(feed_cache, window.now)
+        try:
+            health.check(feed_url)
+        except CircuitOpen as e:
+            return [], e, 0.0, CIRCUIT_OPEN
+        entry    = feed_cache.get(feed_url, {})
+        lookback = self.sources.lookback.get(feed_url, self.sources.default_lookback)
+        date_ok  = window.for_feed(lookback)
+        cap      = self.sources.item_caps.get(feed_url, MAX_ITEMS_PER_FEED_FINAL)
+        interval = self.sources.poll_interval.get(feed_url)
+        mark     = entry.get("high_water") if incremental else None
+        if interval and "items" in entry and window.now - entry.get("fetched_at", 0) < interval:
+            # 低流量來源（例如一週只發幾篇的官方 Blog）：間隔內不連線，上次的結果以這次的日期範圍重新過濾
+            fetched = high_water.unseen([item for item in entry["items"] if date_ok(item.get("published", ""))], mark)
+            if incremental:
+                high_water.advance(entry, fetched)   # 上一版推播失敗而沒前進的部分
+            if seen is not None:
+                fetched = filter_seen(fetched, seen)
+            return fetched, None, 0.0, POLL_SKIPPED
+        with host_limits[urlparse(feed_url).netloc]:
+            start = time.monotonic()   # 排隊等待的時間不算，才能估算逐一抓取要花多久
+            try:
+                try:
+                    resp = self.client.get(feed_url, headers=conditional_headers(entry), timeout=health.timeout(feed_url))
+                except HTTPError as e:
+                    if e.code != 304 or "items" not in entry:
+                        raise
+                    # 304：沿用上次的結果，但以這次的日期範圍重新過濾（昨天抓到的新聞今天就過期了）
+                    fetched = high_water.unseen([item for item in entry["items"] if date_ok(item.get("published", ""))], mark)
+                    status  = NOT_MODIFIED
+                    entry["fetched_at"] = window.now
+                    if incremental:
+                        high_water.advance(entry, fetched)
+                else:
+                    with resp:
+                        chunks  = metrics.TimedIter(read_chunks(resp))   # 分開統計等網路與解析的時間
+                        parsing = time.monotonic()
+                        if parse_pool is None:
+                            fetched = self.parser(chunks, date_filter=date_ok, final_items=cap,
+                                                  blacklist=self.sources.blacklist, stop=high_water.stopper(mark))
+                        else:
+                            # 子行程要整份內容，不能邊讀邊停；換來的是多顆 CPU 同時解析
+                            fetched = parse_pool.parse(b"".join(chunks), window.now, lookback, cap, mark)
+                    metrics.observe("download_seconds", chunks.seconds, feed=feed_url)
+                    metrics.observe("parse_seconds", time.monotonic() - parsing - chunks.seconds, feed=feed_url)
+                    metrics.inc("feed_bytes", chunks.bytes, feed=feed_url)
+                    for item in fetched:
+                        item["source"] = feed_url   # 組 prompt 時依來源順序排優先度
+                    cached = fetched
+                    if mark:
+                        # 碰到高水位就停止解析，這次只拿到新的部分；快取要接上之前的結果，另外留給 304 與一般模式
+                        cached = high_water.merge(fetched, [item for item in entry.get("items", [])
+                                                            if date_ok(item.get("published", ""))], cap)
+                    feed_cache[feed_url] = {
+                        "etag":          resp.headers.get("ETag"),
+                        "last_modified": resp.headers.get("Last-Modified"),
+                        "fetched_on":    window.date,
+                        "fetched_at":    window.now,
+                        "bytes":         int(resp.headers.get("Content-Length") or 0),
+                        "items":         cached,
+                        "health":        health.state(feed_url),
+                    }
+                    if "high_water" in entry:
+                        feed_cache[feed_url]["high_water"] = entry["high_water"]
+                    if incremental:
+                        high_water.advance(feed_cache[feed_url], fetched)
+                    status = FETCHED
+                health.record_success(feed_url, time.monotonic() - start)
+                if seen is not None:
+                    fetched = filter_seen(fetched, seen)
+                return fetched, None, time.monotonic() - start, status
+            except Exception as e:
+                health.record_failure(feed_url, time.monotonic() - start, e)
+                return [], e, time.monotonic() - start, FETCHED
+
+    def iter_categories(self, feed_cache: dict, seen: SeenStore | None = None, incremental: bool = False):
+        """
+        平行抓取所有來源；某個分類的來源全部抓完就立刻產出 (分類, 新聞)。
+        整體逾時時，尚未完成的分類以已抓到的部分產出。每個分類都會產出剛好一次。
+        incremental 為 True 時只產出各來源高水位之後的新聞；推播成功後要呼叫 high_water.commit(feed_cache)
+        """
+        config = self.sources.feeds
+        feeds  = [(category, feed_url) for category, urls in config.items() for feed_url in urls]
+        host_limits = {urlparse(url).netloc: threading.BoundedSemaphore(self.per_host) for _, url in feeds}
+
+        high_water.discard(feed_cache)   # 上次沒推播成功留下的待確認位置
+        start   = time.monotonic()
+        window  = DateWindow()   # 「今天」整次執行只算一次，跨午夜的執行也不會前後不一致
+        health  = HealthTracker(feed_cache, window.now)
+        parse_pool = None
+        if self.use_pool(len(feeds)):
+            parse_pool = ParsePool(self.parse_processes, self.parser, self.sources.blacklist)
+            print(f"⚙️ {len(feeds)} 個來源，改用 {self.parse_processes} 個子行程解析")
+        pool    = ThreadPoolExecutor(max_workers=self.max_workers)
+        # 每個 worker 只改自己那份快取（含健康狀態），完成後才由主執行緒併回 feed_cache：
+        # 逾時而沒等到的 worker 之後還在跑，也碰不到 save_feed_cache 正在序列化的 feed_cache
+        futures = {}
+        for category, url in feeds:
+            local = {url: _detach(feed_cache[url])} if url in feed_cache else {}
+            futures[pool.submit(self.fetch_feed, url, host_limits, local, seen, window, parse_pool,
+                                HealthTracker(local, window.now), incremental)] = (category, url, local)
+        pending = {category: len(urls) for category, urls in config.items()}
+        results = {category: [] for category in config}
+        for category, count in pending.items():
+            if count == 0:
+                yield category, []
+
+        serial = 0.0   # 各來源耗時加總 ≈ 逐一抓取所需時間
+        not_modified, saved_bytes, poll_skipped, archived = 0, 0, 0, 0
+        try:
+            for future in as_completed(futures, timeout=self.deadline):
+                category, feed_url, local = futures[future]
+                fetched, error, elapsed, status = future.result()
+                feed_cache.update(local)
+                serial += elapsed
+                metrics.observe("fetch_seconds", elapsed, feed=feed_url)
+                metrics.inc("items", len(fetched), feed=feed_url)
+                if isinstance(error, CircuitOpen):
+                    metrics.inc("feeds_skipped", feed=feed_url)
+                    print(f"  ⏭️ 略過 {feed_url}：{error}")
+                elif error is not None:
+                    metrics.inc("fetch_errors", feed=feed_url)
+                    print(f"⚠️ 無法抓取 {feed_url}: {error}")
+                elif status == POLL_SKIPPED:
+                    metrics.inc("poll_skipped", feed=feed_url)
+                    poll_skipped += 1
+                    print(f"  📌 {feed_url} → {len(fetched)} 則（未到輪詢間隔，沿用上次結果）")
+                elif status == NOT_MODIFIED:
+                    metrics.inc("not_modified", feed=feed_url)
+                    not_modified += 1
+                    saved_bytes  += feed_cache[feed_url].get("bytes", 0)
+                    print(f"  📌 {feed_url} → {len(fetched)} 則（未更新，沿用快取）")
+                else:
+                    print(f"  📌 {feed_url} → {len(fetched)} 則（{elapsed:.1f} 秒）")
+                results[category].extend(fetched)
+                pending[category] -= 1
+                if pending[category] == 0:
+                    archived += self._archive(category, results[category], window)
+                    yield category, results[category]
+        except FuturesTimeout:
+            for future, (category, feed_url, _) in futures.items():
+                if not future.done():
+                    print(f"⚠️ 抓取逾時 {feed_url}（超過整體時限 {self.deadline} 秒）")
+            for category, count in pending.items():
+                if count > 0:
+                    archived += self._archive(category, results[category], window)
+                    yield category, results[category]
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)   # 逾時的來源不再等待
+            if parse_pool is not None:
+                parse_pool.close()
+        wall = time.monotonic() - start
+        metrics.observe("fetch_all_seconds", wall)
+        print(f"⏱️ 平行抓取 {len(feeds)} 個來源耗時 {wall:.1f} 秒，逐一抓取約需 {serial:.1f} 秒（節省 {serial - wall:.1f} 秒）")
+        if not_modified:
+            print(f"🗄️ {not_modified} 個來源回應 304 未更新，省下約 {saved_bytes / 1024:.0f} KB 下載")
+        if poll_skipped:
+            print(f"🕒 {poll_skipped} 個來源未到最短輪詢間隔，未連線")
+        for line in health.summary([url for _, url in feeds]):
+            print(line)
+        if self.sources.blacklist.hits:
+            print(f"🚫 黑名單過濾 {self.sources.blacklist.summary()}")
+        if archived:
+            print(f"🗄️ 新聞存檔新增 {archived} 則")
+
+    def _archive(self, category: str, items: list[dict], window: DateWindow) -> int:
+        if self.archive is None:
+            return 0
+        with metrics.timer("archive_seconds", category=category):
+            return self.archive.add(category, items, window.now)
+
+    def fetch_all(self, feed_cache: dict, seen: SeenStore | None = None,
+                  incremental: bool = False) -> dict[str, list[dict]]:
+        """全部抓完才回傳，分類依 sources.feeds 的順序"""
+        fetched = dict(self.iter_categories(feed_cache, seen, incremental))
+        return {category: fetched.get(category, []) for category in self.sources.feeds}
@@ -0,0 +1,80 @@
+"""
+一天多版的增量抓取：每個來源的高水位（high-water mark）
+
+一天跑好幾版（早報、午報、晚報）時，每一版只處理上一版之後的新聞：
+  - 增量模式（settings.incremental，INCREMENTAL=true）時，每個來源記住已處理過的最新發布時間與最近幾則的連結
+    （多數 RSS 的 guid 就是連結），存在 feed_cache.json（每個來源的 "high_water"）
+  - 解析時碰到比高水位舊、或連結已處理過的新聞就停止（feed 由新到舊排列），後面的內容不再下載與解析；
+    快取接上之前的結果仍是完整的一份，304 與未到輪詢間隔時沿用的上次結果再以高水位過濾
+  - 這次處理到的位置先記成待確認（"high_water_next"），推播成功後 commit() 才生效；
+    推播失敗或手動測試時不前進，下一版會重新處理（workflow 填了 edition 的手動觸發不算手動測試）
+  - 沒有新新聞的分類不呼叫 LLM，所有分類都沒有時整版略過
+第一次以增量模式抓取的來源沒有高水位，照一般模式處理。
+"""
+from botcore.dates import parse_timestamp
+
+LINK_WINDOW = 50   # 每個來源記住最近幾則的連結（沒有日期或日期相同的新聞靠連結判斷）
+
+
+def stopper(mark: dict | None):
+    """回傳 stop(連結, 發布日期字串) → bool，碰到已處理過的新聞時為 True；沒有高水位時回傳 None"""
+    if not mark:
+        return None
+    published = mark.get("published")
+    links     = set(mark.get("links", ()))
+
+    def stop(link: str, pub_date: str) -> bool:
+        if link and link in links:
+            return True
+        ts = parse_timestamp(pub_date) if pub_date else None
+        # 與高水位同一秒的新聞不一定處理過，交給連結判斷
+        return ts is not None and published is not None and ts < published
+    return stop
+
+
+def unseen(items: list[dict], mark: dict | None) -> list[dict]:
+    """沿用上次結果時（304、未到輪詢間隔），只留下高水位之後的新聞"""
+    stop = stopper(mark)
+    if stop is None:
+        return items
+    return [item for item in items if not stop(item.get("link", ""), item.get("published", ""))]
+
+
+def merge(items: list[dict], cached: list[dict], limit: int) -> list[dict]:
+    """
+    增量解析只拿到高水位之後的新聞，接上上次快取的結果（同一則以連結去重），
+    feed_cache 存的才是完整的一份：之後的 304、未到輪詢間隔或一般模式沿用時不會只剩增量的部分
+    """
+    links = {item.get("link") for item in items if item.get("link")}
+    return (items + [item for item in cached if not item.get("link") or item["link"] not in links])[:limit]
+
+
+def advance(entry: dict, items: list[dict]):
+    """記下這次處理到的位置（待推播成功後 commit）；沒有新新聞時不變"""
+    if not items:
+        return
+    mark   = entry.get("high_water") or {}
+    stamps = [ts for item in items if (ts := parse_timestamp(item.get("published") or "")) is not None]
+    if mark.get("published") is not None:
+        stamps.append(mark["published"])
+    links  = [item["link"] for item in items if item.get("link")] + mark.get("links", [])
+    entry["high_water_next"] = {
+        "published": max(stamps, default=None),
+        "links":     list(dict.fromkeys(links))[:LINK_WINDOW],
+    }
+
+
+def commit(feed_cache: dict) -> int:
+    """推播成功後呼叫：待確認的高水位生效，回傳前進的來源數"""
+    advanced = 0
+    for entry in feed_cache.values():
+        if "high_water_next" in entry:
+            entry["high_water"] = entry.pop("high_water_next")
+            advanced += 1
+    return advanced
+
+
+def discard(feed_cache: dict):
+    """推播失敗或手動測試：丟掉待確認的高水位"""
+    for entry in feed_cache.values():
+        entry.pop("high_water_next", None)
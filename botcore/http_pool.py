@@ -0,0 +1,213 @@
+"""
+共用 HTTP 連線池（news_bot / news_bot_gemini / voteflux_bot / voteflux_weekly 共用）
+
+  - 每個 host 各自保留 keep-alive 連線，重複使用 TCP + TLS 連線
+    （推播時連續發送的訊息、自由時報 4 個 feed 都共用連線）
+  - 自動送出 Accept-Encoding: gzip, deflate，讀取時邊讀邊解壓
+  - 統計新建 / 重用連線數與壓縮前後位元組，執行結束時由 log_stats() 印出
+  - 與 urlopen 相同：3xx 自動轉址，304 與 4xx/5xx 丟出 urllib.error.HTTPError
+
+設定（環境變數）：
+  HTTP_POOL_SIZE  每個 host 保留的閒置連線數（預設 4）
+  HTTP_TIMEOUT    未指定 timeout 時的預設秒數（預設 15）
+"""
+import io
+import os
+import json
+import threading
+import zlib
+import http.client
+from urllib.error import HTTPError
+from urllib.parse import urljoin, urlsplit
+
+USER_AGENT     = "Mozilla/5.0 DailyNewsBot/1.0"
+REDIRECT_CODES = {301, 302, 303, 307, 308}
+MAX_REDIRECTS  = 5
+
+# 重用的閒置連線可能已被伺服器關閉，遇到這些錯誤就換一條新連線重送一次
+STALE_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+class Response:
+    """包裝 http.client.HTTPResponse：自動解壓，關閉時把連線還回連線池"""
+
+    def __init__(self, client: "HttpClient", key: tuple, conn, raw, url: str):
+        self.url     = url
+        self.status  = raw.status
+        self.reason  = raw.reason
+        self.headers = raw.headers
+        self._client = client
+        self._key    = key
+        self._conn   = conn
+        self._raw    = raw
+        encoding = (raw.getheader("Content-Encoding") or "").lower()
+        # MAX_WBITS | 32：自動判斷 gzip 或 zlib 標頭
+        self._decoder = zlib.decompressobj(zlib.MAX_WBITS | 32) if encoding in ("gzip", "deflate") else None
+
+    def read(self, size: int = -1) -> bytes:
+        """讀取解壓後的內容。size > 0 時每次約讀 size 位元組的原始資料，回傳 b"" 代表讀完"""
+        while True:
+            raw = self._raw.read() if size is None or size < 0 else self._raw.read(size)
+            self._client._count(wire_bytes=len(raw))
+            if self._decoder is None:
+                data = raw
+            elif raw:
+                data = self._decoder.decompress(raw)
+            else:
+                data = self._decoder.flush()
+            self._client._count(body_bytes=len(data))
+            if data or not raw:
+                return data
+
+    def iter_chunks(self, size: int = 8192):
+        """逐段產生已解壓的內容，有資料就立刻交出（不等湊滿 size），適合 SSE 串流"""
+        while True:
+            raw = self._raw.read1(size)
+            self._client._count(wire_bytes=len(raw))
+            if not raw:
+                tail = self._decoder.flush() if self._decoder is not None else b""
+                self._client._count(body_bytes=len(tail))
+                if tail:
+                    yield tail
+                return
+            data = self._decoder.decompress(raw) if self._decoder is not None else raw
+            self._client._count(body_bytes=len(data))
+            if data:
+                yield data
+
+    def json(self):
+        return json.loads(self.read().decode("utf-8"))
+
+    def close(self):
+        if self._conn is None:
+            return
+        # 內容完整讀完且伺服器沒要求關閉，連線才能給下一個請求用；中途放棄的直接關掉
+        if self._raw.isclosed() and not self._raw.will_close:
+            self._client._release(self._key, self._conn)
+        else:
+            self._raw.close()
+            self._conn.close()
+        self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class HttpClient:
+    """以 (scheme, host, port) 為單位的 keep-alive 連線池，可在多個執行緒間共用"""
+
+    def __init__(self, pool_size: int | None = None, timeout: float | None = None):
+        self.pool_size = pool_size or int(os.environ.get("HTTP_POOL_SIZE", "4"))
+        self.timeout   = timeout or float(os.environ.get("HTTP_TIMEOUT", "15"))
+        self.stats     = {"opened": 0, "reused": 0, "requests": 0, "wire_bytes": 0, "body_bytes": 0}
+        self._idle     = {}
+        self._lock     = threading.Lock()
+
+    # ─── 連線池 ──────────────────────────────────────────────────────────────
+    def _count(self, **deltas):
+        with self._lock:
+            for name, value in deltas.items():
+                self.stats[name] += value
+
+    def _new_conn(self, key: tuple, timeout: float):
+        scheme, host, port = key
+        conn_cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        self._count(opened=1)
+        return conn_cls(host, port, timeout=timeout)
+
+    def _acquire(self, key: tuple, timeout: float):
+        with self._lock:
+            idle = self._idle.get(key)
+            conn = idle.pop() if idle else None
+        if conn is None:
+            return self._new_conn(key, timeout), False
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        self._count(reused=1)
+        return conn, True
+
+    def _release(self, key: tuple, conn):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.pool_size:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            conns = [conn for idle in self._idle.values() for conn in idle]
+            self._idle.clear()
+        for conn in conns:
+            conn.close()
+
+    # ─── 請求 ────────────────────────────────────────────────────────────────
+    def _send(self, method: str, url: str, body: bytes | None, headers: dict, timeout: float) -> Response:
+        parts = urlsplit(url)
+        key   = (parts.scheme, parts.hostname, parts.port)
+        path  = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        conn, reused = self._acquire(key, timeout)
+        self._count(requests=1)
+        try:
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                raw = conn.getresponse()
+            except STALE_ERRORS:
+                conn.close()
+                if not reused:
+                    raise
+                conn = self._new_conn(key, timeout)
+                conn.request(method, path, body=body, headers=headers)
+                raw = conn.getresponse()
+        except Exception:
+            conn.close()
+            raise
+        return Response(self, key, conn, raw, url)
+
+    def request(self, method: str, url: str, body: bytes | None = None,
+                headers: dict | None = None, timeout: float | None = None) -> Response:
+        """送出請求並回傳 Response（請用 with 包起來，讀完後連線會自動還回連線池）"""
+        headers = {"User-Agent": USER_AGENT, "Accept-Encoding": "gzip, deflate", **(headers or {})}
+        timeout = timeout or self.timeout
+        for _ in range(MAX_REDIRECTS + 1):
+            resp = self._send(method, url, body, headers, timeout)
+            location = resp.headers.get("Location")
+            if resp.status in REDIRECT_CODES and location:
+                with resp:
+                    resp.read()
+                url = urljoin(url, location)
+                if resp.status == 303 or (resp.status in (301, 302) and method == "POST"):
+                    method, body = "GET", None
+                continue
+            if resp.status >= 300:
+                with resp:
+                    payload = resp.read()
+                raise HTTPError(url, resp.status, resp.reason, resp.headers, io.BytesIO(payload))
+            return resp
+        raise HTTPError(url, resp.status, f"超過 {MAX_REDIRECTS} 次轉址", resp.headers, None)
+
+    def get(self, url: str, headers: dict | None = None, timeout: float | None = None) -> Response:
+        return self.request("GET", url, headers=headers, timeout=timeout)
+
+    def post_json(self, url: str, payload: dict, headers: dict | None = None, timeout: float | None = None):
+        """POST JSON 並回傳解析後的 JSON"""
+        body = json.dumps(payload).encode("utf-8")
+        headers = {"Content-Type": "application/json", **(headers or {})}
+        with self.request("POST", url, body=body, headers=headers, timeout=timeout) as resp:
+            return resp.json()
+
+    def log_stats(self):
+        s = self.stats
+        saved = s["body_bytes"] - s["wire_bytes"]
+        print(
+            f"🔌 HTTP：{s['requests']} 個請求，新建 {s['opened']} 條連線、重用 {s['reused']} 次；"
+            f"下載 {s['wire_bytes'] / 1024:.0f} KB（解壓後 {s['body_bytes'] / 1024:.0f} KB，壓縮省下 {saved / 1024:.0f} KB）"
+        )
+
+
+# 整個程序共用一個連線池
+client = HttpClient()
@@ -0,0 +1,131 @@
+"""
+LLM 回應快取（內容定址，SQLite）
+
+摘要完成後才失敗的排程、或 IS_MANUAL 手動測試重跑時，同樣的 prompt 不必再付一次錢：
+  - key = SHA-256(模型、system prompt、正規化後的 user prompt、生成參數)
+    prompt 內含當天日期，所以同一天重跑會命中、隔天自然失效
+  - 存在 state/llm_cache.sqlite3，與其他狀態檔一起由 Actions Cache 保留
+  - 超過 TTL 的不使用；總大小超過上限時淘汰最久沒用到的（LRU）
+  - 命中 / 未命中次數由 log_stats() 印在執行 log
+
+設定（環境變數）：
+  LLM_CACHE_PATH       快取檔位置（預設 state/llm_cache.sqlite3）
+  LLM_CACHE_TTL_HOURS  有效時間（預設 24 小時）
+  LLM_CACHE_MAX_MB     大小上限（預設 20 MB）
+  LLM_CACHE            設為 off 時停用
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+from botcore.config import STATE_DIR
+
+DEFAULT_PATH = os.path.join(STATE_DIR, "llm_cache.sqlite3")
+
+
+def normalize_prompt(text: str) -> str:
+    """統一換行、去掉每行行尾空白與前後空行，排版差異不影響 key"""
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+
+def cache_key(model: str, system: str, prompt: str, config: dict | None = None) -> str:
+    payload = json.dumps(
+        [model, normalize_prompt(system), normalize_prompt(prompt), config or {}],
+        ensure_ascii=False, sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, path: str | None = None, ttl_hours: float | None = None, max_mb: float | None = None):
+        self.path      = path or os.environ.get("LLM_CACHE_PATH", DEFAULT_PATH)
+        self.ttl       = 3600 * (ttl_hours or float(os.environ.get("LLM_CACHE_TTL_HOURS", "24")))
+        self.max_bytes = int(1024 * 1024 * (max_mb or float(os.environ.get("LLM_CACHE_MAX_MB", "20"))))
+        self.enabled   = os.environ.get("LLM_CACHE", "on").lower() != "off"
+        self.stats     = {"hits": 0, "misses": 0}
+        self._db       = None
+        self._lock     = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        # 第一次用到才開檔，import 時不碰檔案系統
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                " created REAL NOT NULL, accessed REAL NOT NULL, size INTEGER NOT NULL)"
+            )
+        return self._db
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            db  = self._conn()
+            row = db.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                return None
+            db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            db.commit()
+            return row[0]
+
+    def put(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            db = self._conn()
+            db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, value, now, now, len(value.encode("utf-8"))),
+            )
+            db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                rows = db.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall()
+                for old_key, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    db.execute("DELETE FROM responses WHERE key = ?", (old_key,))
+                    total -= size
+            db.commit()
+
+    def cached_call(self, fn, *, model: str, system: str, prompt: str, config: dict | None = None,
+                    validate=None) -> str:
+        """
+        有快取就直接回傳，否則呼叫 fn() 並把結果存起來。
+        validate(value) 丟出例外時不存（例如回應不是合法 JSON），避免重跑時拿到同一個壞掉的回應
+        """
+        if not self.enabled:
+            value = fn()
+            if validate is not None:
+                validate(value)
+            return value
+        key = cache_key(model, system, prompt, config)
+        try:
+            value = self.get(key)
+        except sqlite3.Error as e:
+            print(f"⚠️ LLM 快取讀取失敗，直接呼叫 API: {e}")
+            value = None
+        with self._lock:
+            self.stats["hits" if value is not None else "misses"] += 1
+        if value is not None:
+            return value
+        value = fn()
+        if validate is not None:
+            validate(value)
+        try:
+            self.put(key, value)
+        except sqlite3.Error as e:
+            print(f"⚠️ LLM 快取寫入失敗: {e}")
+        return value
+
+    def log_stats(self):
+        if self.enabled and (self.stats["hits"] or self.stats["misses"]):
+            print(f"🗃️ LLM 快取：命中 {self.stats['hits']} 次、未命中 {self.stats['misses']} 次")
+
+
+# 整個程序共用一個快取
+cache = LLMCache()
@@ -0,0 +1,147 @@
+"""
+LLM 串流回應（SSE）
+
+不再等整段回應生成完才一次收到：
+  - OpenAI Chat Completions（stream: true）、OpenAI Responses API（stream: true）、
+    Gemini streamGenerateContent（alt=sse）三種格式都以 Server-Sent Events 逐段讀取
+  - 記錄首個 token 的等待時間（TTFT）與總耗時
+  - stop_when 判斷內容已經完整時（例如 JSON 物件已經閉合、條列已達上限）就提早關閉連線
+  - timeout 變成「多久沒收到新資料」的閒置時限，長篇生成不會再被整體 timeout 切斷
+"""
+import json
+import time
+
+from botcore import metrics
+from botcore.http_pool import client as http_client
+
+
+def iter_sse(resp):
+    """把 SSE 串流拆成 (event, data) — 以空行分隔事件，data 可能跨多行"""
+    buffer = b""
+    event, data = None, []
+    for chunk in resp.iter_chunks():
+        buffer += chunk
+        while b"\n" in buffer:
+            line, buffer = buffer.split(b"\n", 1)
+            line = line.rstrip(b"\r").decode("utf-8")
+            if not line:
+                if data:
+                    yield event, "\n".join(data)
+                event, data = None, []
+            elif line.startswith(":"):
+                continue   # SSE 註解 / keep-alive
+            elif line.startswith("event:"):
+                event = line[6:].strip()
+            elif line.startswith("data:"):
+                data.append(line[5:].lstrip())
+    if data:
+        yield event, "\n".join(data)
+
+
+# ─── 各 API 的 delta 取法：回傳新增的文字，None 代表串流結束 ──────────────────────
+def openai_chat_delta(event: str | None, data: str) -> str | None:
+    if data == "[DONE]":
+        return None
+    choices = json.loads(data).get("choices") or [{}]
+    return choices[0].get("delta", {}).get("content") or ""
+
+
+def openai_responses_delta(event: str | None, data: str) -> str | None:
+    payload = json.loads(data)
+    kind    = event or payload.get("type")
+    if kind == "response.output_text.delta":
+        return payload.get("delta", "")
+    if kind == "response.completed":
+        return None
+    if kind in ("error", "response.failed", "response.incomplete"):
+        raise RuntimeError(f"OpenAI Responses API 串流錯誤: {data[:500]}")
+    return ""
+
+
+def gemini_delta(event: str | None, data: str) -> str | None:
+    payload = json.loads(data)
+    if "error" in payload:
+        raise RuntimeError(f"Gemini 串流錯誤: {data[:500]}")
+    candidates = payload.get("candidates") or [{}]
+    parts = candidates[0].get("content", {}).get("parts", [])
+    return "".join(part.get("text", "") for part in parts)
+
+
+# ─── 提早結束的判斷 ───────────────────────────────────────────────────────────
+class JsonObjectDone:
+    """最外層的 JSON 物件閉合時回傳 True（逐段累計狀態，不重新掃描整段文字）"""
+
+    def __init__(self):
+        self.depth     = 0
+        self.started   = False
+        self.in_string = False
+        self.escaped   = False
+
+    def __call__(self, delta: str) -> bool:
+        for ch in delta:
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"' and self.started:
+                self.in_string = True
+            elif ch == "{":
+                self.depth  += 1
+                self.started = True
+            elif ch == "}" and self.started:
+                self.depth -= 1
+                if self.depth == 0:
+                    return True
+        return False
+
+
+class BulletsDone:
+    """第 limit 則條列（以 marker 開頭）那一行寫完時回傳 True"""
+
+    def __init__(self, limit: int, marker: str = "•"):
+        self.limit  = limit
+        self.marker = marker
+        self.count  = 0
+
+    def __call__(self, delta: str) -> bool:
+        for ch in delta:
+            if ch == self.marker:
+                self.count += 1
+            elif ch == "\n" and self.count >= self.limit:
+                return True
+        return False
+
+
+def stream_text(url: str, payload: dict, delta_fn, *, headers: dict | None = None,
+                timeout: float = 60, stop_when=None, label: str = "LLM") -> str:
+    """送出串流請求並逐段組合文字，回傳完整（或提早結束時到目前為止的）內容"""
+    start, first = time.monotonic(), None
+    pieces, stopped = [], False
+    body    = json.dumps(payload).encode("utf-8")
+    headers = {"Content-Type": "application/json", "Accept": "text/event-stream", **(headers or {})}
+    with http_client.request("POST", url, body=body, headers=headers, timeout=timeout) as resp:
+        for event, data in iter_sse(resp):
+            delta = delta_fn(event, data)
+            if delta is None:
+                break
+            if not delta:
+                continue
+            if first is None:
+                first = time.monotonic() - start
+            pieces.append(delta)
+            if stop_when is not None and stop_when(delta):
+                stopped = True
+                break
+    text  = "".join(pieces)
+    total = time.monotonic() - start
+    metrics.observe("llm_seconds", total, label=label)
+    if first is not None:
+        metrics.observe("llm_first_token_seconds", first, label=label)
+    metrics.inc("llm_output_chars", len(text), label=label)
+    note = "，內容已完整提早結束" if stopped else ""
+    ttft = f"{first:.1f}" if first is not None else "-"
+    print(f"  ⚡ {label}：首個 token {ttft} 秒，完成 {total:.1f} 秒，{len(text)} 字{note}")
+    return text
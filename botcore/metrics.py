@@ -0,0 +1,186 @@
+"""
+執行指標（計時器 + 計數器）
+
+四個 Bot 共用的執行指標，排程變慢時看得出是哪個 feed、LLM 退避還是推播拖慢：
+  - timer(name, **labels)：以 with 區塊計時（抓取、解析、去重複、組 prompt、LLM、推播…），
+    同名同標籤的多次計時累計成 次數 / 總秒數 / 最大值
+  - observe(name, seconds, **labels)：已經量好的秒數直接記錄
+  - inc(name, amount, **labels)：計數器（位元組、新聞數、token、重試次數…）
+  - TimedIter：包住讀取 socket 的迭代器，把「等網路」與「解析」的時間分開
+  - write_run(bot, out_dir)：執行結束時寫出 JSON 執行記錄（run-<bot>.json）與
+    Prometheus 文字格式（<bot>.prom），可交給 node_exporter textfile collector 或 Pushgateway
+
+設定（環境變數）：
+  METRICS  設為 off 時停用：timer 回傳共用的空 context manager，inc / observe 直接返回，幾乎沒有額外開銷
+"""
+import os
+import re
+import json
+import time
+import threading
+from contextlib import nullcontext
+from datetime import datetime, timezone
+
+ENABLED = os.environ.get("METRICS", "on").lower() != "off"
+PREFIX  = "newsbot"
+
+_NULL_TIMER = nullcontext()
+_NAME_RE    = re.compile(r"[^a-zA-Z0-9_]")
+
+
+class Timer:
+    def __init__(self, registry: "Registry", name: str, labels: dict):
+        self.registry = registry
+        self.name     = name
+        self.labels   = labels
+        self.seconds  = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self._start
+        self.registry.observe(self.name, self.seconds, **self.labels)
+        return False
+
+
+class TimedIter:
+    """累計花在取得下一筆（例如 resp.read）的秒數與位元組"""
+
+    def __init__(self, iterable):
+        self._it     = iter(iterable)
+        self.seconds = 0.0
+        self.bytes   = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            chunk = next(self._it)
+        finally:
+            self.seconds += time.perf_counter() - start
+        self.bytes += len(chunk)
+        return chunk
+
+
+class Registry:
+    def __init__(self):
+        self.started  = time.time()
+        self.timers   = {}   # (名稱, 標籤) → [次數, 總秒數, 最大值]
+        self.counters = {}   # (名稱, 標籤) → 累計值
+        self._lock    = threading.Lock()
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            stat = self.timers.setdefault(key, [0, 0.0, 0.0])
+            stat[0] += 1
+            stat[1] += seconds
+            stat[2]  = max(stat[2], seconds)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def record(self, bot: str, extra: dict | None = None) -> dict:
+        with self._lock:
+            timers = [
+                {"name": name, "labels": dict(labels), "count": count, "seconds": round(total, 4), "max": round(peak, 4)}
+                for (name, labels), (count, total, peak) in sorted(self.timers.items())
+            ]
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self.counters.items())
+            ]
+        return {
+            "bot":        bot,
+            "started_at": datetime.fromtimestamp(self.started, timezone.utc).isoformat(timespec="seconds"),
+            "duration":   round(time.time() - self.started, 3),
+            "timers":     timers,
+            "counters":   counters,
+            **(extra or {}),
+        }
+
+    def to_prometheus(self, bot: str, extra: dict | None = None) -> str:
+        """
+        Prometheus 文字格式：計時器輸出 _total（秒）/ _count / _max，計數器輸出 _total；
+        extra 中的數值（例如 {"http": {"requests": 12}}）輸出成 gauge
+        """
+        def labels_text(labels: tuple) -> str:
+            pairs = [("bot", bot), *labels]
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+        # 同一個 metric family 的樣本必須連續輸出，先依 family 分組
+        families = {}   # family 名稱 → (型別, 樣本)
+
+        def add(family: str, kind: str, sample: str):
+            families.setdefault(family, (kind, []))[1].append(sample)
+
+        with self._lock:
+            timers   = sorted(self.timers.items())
+            counters = sorted(self.counters.items())
+        for (name, labels), (count, total, peak) in timers:
+            base = f"{PREFIX}_{_NAME_RE.sub('_', name)}"
+            add(f"{base}_total", "counter", f"{base}_total{labels_text(labels)} {total:.6f}")
+            add(f"{base}_count", "counter", f"{base}_count{labels_text(labels)} {count}")
+            add(f"{base}_max", "gauge", f"{base}_max{labels_text(labels)} {peak:.6f}")
+        for (name, labels), value in counters:
+            base = f"{PREFIX}_{_NAME_RE.sub('_', name)}_total"
+            add(base, "counter", f"{base}{labels_text(labels)} {value}")
+        for section, values in (extra or {}).items():
+            for key, value in values.items():
+                if isinstance(value, (int, float)):
+                    base = f"{PREFIX}_{_NAME_RE.sub('_', section)}_{_NAME_RE.sub('_', key)}"
+                    add(base, "gauge", f'{base}{{bot="{bot}"}} {value}')
+
+        lines = []
+        for family, (kind, samples) in families.items():
+            lines.append(f"# TYPE {family} {kind}")
+            lines += samples
+        lines.append(f"# TYPE {PREFIX}_run_duration_seconds gauge")
+        lines.append(f'{PREFIX}_run_duration_seconds{{bot="{bot}"}} {time.time() - self.started:.3f}')
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# 整個程序共用一組指標
+registry = Registry()
+
+
+def timer(name: str, **labels):
+    if not ENABLED:
+        return _NULL_TIMER
+    return Timer(registry, name, labels)
+
+
+def observe(name: str, seconds: float, **labels):
+    if ENABLED:
+        registry.observe(name, seconds, **labels)
+
+
+def inc(name: str, amount: float = 1, **labels):
+    if ENABLED:
+        registry.inc(name, amount, **labels)
+
+
+def write_run(bot: str, out_dir: str, extra: dict | None = None):
+    """寫出 run-<bot>.json 與 <bot>.prom；extra 併入 JSON（例如 HTTP、LLM 快取的統計）"""
+    if not ENABLED:
+        return
+    try:
+        os.makedirs(out_dir, exist_ok=True)
+        path = os.path.join(out_dir, f"run-{bot}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(registry.record(bot, extra), f, ensure_ascii=False, indent=2)
+        with open(os.path.join(out_dir, f"{bot}.prom"), "w", encoding="utf-8") as f:
+            f.write(registry.to_prometheus(bot, extra))
+        print(f"📈 執行指標已寫入 {path}")
+    except OSError as e:
+        print(f"⚠️ 無法寫入執行指標: {e}")
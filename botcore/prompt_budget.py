@@ -0,0 +1,79 @@
+"""
+依 token 預算組 prompt
+
+在每個分類的 token 預算內挑選要放進 prompt 的新聞：
+  - 以離線的近似法估算 token 數（不需下載 tokenizer）：中日韓文字約 1 字 1 token，其餘約 4 字元 1 token
+  - 依重要性排序：相似報導數（多家媒體都報）> 來源優先序（feeds.toml 中越前面越優先）+ 新鮮度
+  - 在每個分類的預算內貪婪裝箱；整則放不下時退而只放標題；連標題都放不下才捨棄
+  - 回傳使用 / 捨棄的 token 數，方便在 log 裡看每天的 prompt 成本
+"""
+import re
+import time
+
+from botcore.dates import parse_timestamp
+
+_CJK_RE = re.compile(r"[　-〿㐀-鿿豈-﫿＀-￯]")
+
+RECENCY_WINDOW = 24 * 3600   # 超過 24 小時的新聞新鮮度分數為 0
+
+
+def estimate_tokens(text: str) -> int:
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def render_item(index: int, item: dict, with_description: bool = True) -> str:
+    """單則新聞在 prompt 中的樣子"""
+    text = f"{index}. {item['title']}"
+    if item.get("duplicates"):
+        text += f"（另有 {item['duplicates']} 則相似報導）"   # 多家媒體都報的通常比較重要
+    text += "\n"
+    if with_description and item.get("description"):
+        text += f"   {item['description']}\n"
+    return text
+
+
+def published_ts(item: dict) -> float | None:
+    pub = item.get("published") or ""
+    return parse_timestamp(pub) if pub else None   # 與日期過濾共用快取，同一則新聞不會解析兩次
+
+
+def rank_items(items: list[dict], sources: list[str], now: float | None = None) -> list[dict]:
+    """由重要到不重要排序"""
+    now = now or time.time()
+    priority = {url: i for i, url in enumerate(sources)}
+
+    def score(item: dict) -> float:
+        rank    = priority.get(item.get("source"), len(sources))
+        source  = 1 - rank / max(len(sources), 1)
+        ts      = published_ts(item)
+        recency = 0.5 if ts is None else max(0.0, 1 - (now - ts) / RECENCY_WINDOW)
+        return item.get("duplicates", 0) * 2 + source + recency
+
+    return sorted(items, key=score, reverse=True)
+
+
+def pack_items(items: list[dict], budget: int, sources: list[str], now: float | None = None) -> tuple[list[dict], dict]:
+    """
+    在 budget token 內挑出要放進 prompt 的新聞，回傳 (新聞, 統計)。
+    只放得下標題的新聞會回傳去掉 description 的副本
+    """
+    packed, used = [], 0
+    stats = {"used": 0, "dropped": 0, "dropped_tokens": 0, "trimmed": 0}
+    for item in rank_items(items, sources, now):
+        full = estimate_tokens(render_item(len(packed) + 1, item))
+        if used + full <= budget:
+            packed.append(item)
+            used += full
+            continue
+        title_only = estimate_tokens(render_item(len(packed) + 1, item, with_description=False))
+        if used + title_only <= budget:
+            packed.append({**item, "description": ""})
+            used += title_only
+            stats["trimmed"] += 1
+            stats["dropped_tokens"] += full - title_only
+            continue
+        stats["dropped"] += 1
+        stats["dropped_tokens"] += full
+    stats["used"] = used
+    return packed, stats
@@ -0,0 +1,112 @@
+"""
+API 速率限制與重試
+
+  - TokenBucket：每分鐘補充固定額度的令牌桶，可同時用於「每分鐘請求數」與「每分鐘 token 數」
+  - RateLimiter：把 RPM 與 TPM 兩個桶綁在一起，例如 Gemini 免費方案的 10 RPM / 250k TPM
+  - call_with_retry：遇到 429 / 5xx / 網路錯誤時以加上隨機抖動的指數退避重試，
+    伺服器有給 Retry-After（或 Gemini 錯誤內容中的 retryDelay、Telegram 的 retry_after）時以伺服器指定的時間為準
+
+令牌不足時採「先預約、再等待」：額度可以預支成負數，後來的呼叫會排在後面等更久，
+多個執行緒同時呼叫時也能依序平均分配，不會一起擠爆。
+"""
+import re
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from urllib.error import HTTPError, URLError
+
+from botcore import metrics
+
+RETRY_STATUS    = {429, 500, 502, 503, 504}
+_RETRY_DELAY_RE = re.compile(r'"retryDelay"\s*:\s*"(\d+(?:\.\d+)?)s"|"retry_after"\s*:\s*(\d+(?:\.\d+)?)')
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float, capacity: float | None = None):
+        self.rate     = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self._tokens  = self.capacity
+        self._updated = time.monotonic()
+        self._lock    = threading.Lock()
+
+    def reserve(self, amount: float = 1) -> float:
+        """預約 amount 個令牌，回傳需要等待的秒數（不會真的等待）"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens  = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= min(amount, self.capacity)
+            return max(0.0, -self._tokens / self.rate)
+
+
+class RateLimiter:
+    """同時受每分鐘請求數（rpm）與每分鐘 token 數（tpm）限制"""
+
+    def __init__(self, rpm: float, tpm: float | None = None):
+        self.requests = TokenBucket(rpm)
+        self.tokens   = TokenBucket(tpm) if tpm else None
+
+    def acquire(self, tokens: int = 0) -> float:
+        """取得一次呼叫的額度，必要時等待；回傳實際等待秒數"""
+        wait = self.requests.reserve(1)
+        if self.tokens is not None and tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        if wait > 0:
+            metrics.observe("rate_limit_wait_seconds", wait)
+            time.sleep(wait)
+        return wait
+
+
+def server_retry_delay(error: Exception) -> float | None:
+    """從 Retry-After 標頭、Gemini 的 retryDelay 或 Telegram 的 retry_after 取得伺服器指定的等待秒數"""
+    if not isinstance(error, HTTPError):
+        return None
+    retry_after = error.headers.get("Retry-After") if error.headers else None
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    try:
+        body = error.read().decode("utf-8", errors="replace")
+    except Exception:
+        return None
+    match = _RETRY_DELAY_RE.search(body)
+    return float(match.group(1) or match.group(2)) if match else None
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, HTTPError):
+        return error.code in RETRY_STATUS
+    return isinstance(error, (URLError, TimeoutError, ConnectionError))
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """第 attempt 次重試的等待秒數：指數成長，一半固定、一半隨機（equal jitter）"""
+    delay = min(cap, base * (2 ** (attempt - 1)))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def call_with_retry(fn, *, label: str = "API", max_attempts: int = 4, base_delay: float = 2.0,
+                    max_delay: float = 60.0, limiter: RateLimiter | None = None, tokens: int = 0):
+    """呼叫 fn()，可重試的錯誤依退避時間重試；每次嘗試前都先向 limiter 取得額度"""
+    for attempt in range(1, max_attempts + 1):
+        if limiter is not None:
+            limiter.acquire(tokens)
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == max_attempts or not is_retryable(e):
+                raise
+            delay = server_retry_delay(e)
+            if delay is None:
+                delay = backoff_delay(attempt, base_delay, max_delay)
+            api = label.split()[0]   # 標籤只取 API 名稱（Gemini / Telegram），不帶分類或 chat_id
+            metrics.inc("retries", api=api)
+            metrics.observe("backoff_seconds", delay, api=api)
+            print(f"  ⏳ {label} 暫時失敗（{e}），{delay:.1f} 秒後重試（第 {attempt}/{max_attempts - 1} 次）...")
+            time.sleep(delay)
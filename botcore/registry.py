@@ -0,0 +1,90 @@
+"""
+新聞來源登記檔（feeds.toml）
+
+兩個新聞 Bot 共用的來源清單：
+  - 所有來源寫在 feeds.toml，每個來源可設定分類、語言、時區、優先順序、則數上限、最短輪詢間隔與適用的 Bot
+  - load() 依 Bot 篩選，分類依 categories 的順序、分類內依 priority 再依檔案順序排列
+  - to_sources() 轉成 FeedSources；最短輪詢間隔內 FeedFetcher 不連線，直接沿用上次抓到的新聞
+  - 沒有設定 lookback 的外國時區來源預設回溯 24 小時（美國時間比台灣晚，早上跑時文章日期還是昨天）
+
+設定（環境變數）：
+  FEED_REGISTRY  登記檔位置（預設為專案根目錄的 feeds.toml）
+"""
+import os
+import tomllib
+from dataclasses import dataclass, fields
+
+from botcore.dates import parse_lookback
+from botcore.feeds import MAX_ITEMS_PER_FEED_FINAL, FeedSources
+
+DEFAULT_FILE     = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "feeds.toml")
+HOME_TZ          = "Asia/Taipei"
+FOREIGN_LOOKBACK = "24h"
+
+
+@dataclass(frozen=True)
+class Feed:
+    url: str
+    category: str
+    name: str = ""
+    language: str = "zh-TW"
+    timezone: str = HOME_TZ
+    lookback: str | float | None = None
+    priority: int = 100                        # 數字越小越前面
+    max_items: int = MAX_ITEMS_PER_FEED_FINAL
+    min_interval: str | float | None = None    # 最短輪詢間隔，None 代表每次執行都抓
+    bots: tuple[str, ...] = ()                 # 空的代表所有 Bot 都用
+
+    @property
+    def effective_lookback(self) -> str | float | None:
+        if self.lookback is not None:
+            return self.lookback
+        return FOREIGN_LOOKBACK if self.timezone != HOME_TZ else None
+
+
+def _feed(raw: dict, categories: list[str]) -> Feed:
+    known   = {f.name for f in fields(Feed)}
+    unknown = set(raw) - known
+    if unknown:
+        raise ValueError(f"feeds.toml 有無法辨識的欄位 {sorted(unknown)}：{raw.get('url', raw)}")
+    if "url" not in raw or "category" not in raw:
+        raise ValueError(f"feeds.toml 的來源缺少 url 或 category：{raw}")
+    if raw["category"] not in categories:
+        raise ValueError(f"{raw['url']} 的分類 {raw['category']!r} 沒有列在 categories 中")
+    feed = Feed(**{**raw, "bots": tuple(raw.get("bots", ()))})
+    # 時間格式寫錯時在啟動就報錯
+    parse_lookback(feed.lookback)
+    parse_lookback(feed.min_interval)
+    return feed
+
+
+def load(bot: str | None = None, path: str | None = None) -> dict[str, list[Feed]]:
+    """讀取登記檔，回傳 分類 → 來源（已排序）；bot 不為 None 時只保留適用該 Bot 的來源，沒有來源的分類略過"""
+    path = path or os.environ.get("FEED_REGISTRY", DEFAULT_FILE)
+    with open(path, "rb") as f:
+        data = tomllib.load(f)
+    categories = data.get("categories", [])
+    feeds      = [_feed(raw, categories) for raw in data.get("feed", [])]
+    if bot is not None:
+        feeds = [feed for feed in feeds if not feed.bots or bot in feed.bots]
+    urls = [feed.url for feed in feeds]
+    duplicated = {url for url in urls if urls.count(url) > 1}
+    if duplicated:
+        raise ValueError(f"feeds.toml 有重複的來源：{sorted(duplicated)}")
+    registry = {}
+    for category in categories:
+        in_category = sorted((feed for feed in feeds if feed.category == category), key=lambda feed: feed.priority)
+        if in_category:
+            registry[category] = in_category
+    return registry
+
+
+def to_sources(registry: dict[str, list[Feed]], blacklist=()) -> FeedSources:
+    feeds = [feed for in_category in registry.values() for feed in in_category]
+    return FeedSources(
+        {category: [feed.url for feed in in_category] for category, in_category in registry.items()},
+        lookback={feed.url: feed.effective_lookback for feed in feeds if feed.effective_lookback is not None},
+        blacklist=blacklist,
+        item_caps={feed.url: feed.max_items for feed in feeds},
+        poll_interval={feed.url: feed.min_interval for feed in feeds if feed.min_interval},
+    )
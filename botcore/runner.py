@@ -0,0 +1,19 @@
+"""
+Bot 進入點的共用收尾
+
+四個腳本的 `if __name__ == "__main__"` 都是同一段：執行 main()，不論成功或失敗都印出連線池與
+LLM 快取的統計，並寫出執行指標。
+"""
+from botcore import metrics
+from botcore.config import STATE_DIR
+from botcore.http_pool import client as http_client
+from botcore.llm_cache import cache as llm_cache
+
+
+def run(bot: str, main, out_dir: str = STATE_DIR):
+    try:
+        main()
+    finally:
+        http_client.log_stats()   # 連線重用與壓縮節省的統計
+        llm_cache.log_stats()
+        metrics.write_run(bot, out_dir, {"http": http_client.stats, "llm_cache": llm_cache.stats})
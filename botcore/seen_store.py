@@ -0,0 +1,115 @@
+"""
+已推播標題記錄（固定寬度二進位格式）
+
+取代原本的 seen_titles.json（hex MD5 字串 + set，保留時順序不固定，可能把最新的記錄丟掉）：
+  - 每筆只存 MD5 前 8 bytes，依推播先後放在環狀緩衝區，滿了就丟最舊的（真正的 FIFO）
+  - 另外維護 digest → 位置 的 dict，查詢 O(1)
+  - 檔案格式：表頭（magic、寬度、容量、筆數）+ 依舊到新排列的 digest，讀取時用 mmap
+  - 2 萬筆約 160 KB（同樣筆數的 hex JSON 約 700 KB）
+  - 第一次執行時自動把舊的 seen_titles.json 轉進來
+"""
+import os
+import json
+import mmap
+import struct
+import hashlib
+
+MAGIC            = b"SEEN"
+HEADER           = struct.Struct("<4sBxxxII")   # magic, 寬度, 容量, 筆數
+DEFAULT_WIDTH    = 8
+DEFAULT_CAPACITY = 20_000
+
+
+def title_digest(title: str, width: int = DEFAULT_WIDTH) -> bytes:
+    """標題的固定寬度 digest（MD5 前 width bytes）"""
+    return hashlib.md5(title.strip().encode("utf-8")).digest()[:width]
+
+
+class SeenStore:
+    """以環狀緩衝區保存最近 capacity 筆 digest，介面與原本的 set 相容（in / add / len）"""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, width: int = DEFAULT_WIDTH):
+        self.capacity = capacity
+        self.width    = width
+        self._ring    = bytearray(capacity * width)
+        self._index   = {}    # digest → 在環狀緩衝區中的位置
+        self._head    = 0     # 下一筆要寫入的位置
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, digest: bytes) -> bool:
+        return digest in self._index
+
+    def add(self, digest: bytes):
+        if len(digest) != self.width:
+            raise ValueError(f"digest 長度應為 {self.width} bytes，收到 {len(digest)}")
+        if digest in self._index:
+            return
+        slot  = self._head
+        start = slot * self.width
+        if len(self._index) == self.capacity:
+            del self._index[bytes(self._ring[start:start + self.width])]   # 擠掉最舊的一筆
+        self._ring[start:start + self.width] = digest
+        self._index[digest] = slot
+        self._head = (slot + 1) % self.capacity
+
+    def __iter__(self):
+        """由舊到新列出 digest"""
+        count = len(self._index)
+        first = (self._head - count) % self.capacity
+        for i in range(count):
+            start = ((first + i) % self.capacity) * self.width
+            yield bytes(self._ring[start:start + self.width])
+
+    # ─── 讀寫檔案 ────────────────────────────────────────────────────────────
+    @classmethod
+    def load(cls, path: str, legacy_json: str | None = None,
+             capacity: int = DEFAULT_CAPACITY, width: int = DEFAULT_WIDTH) -> "SeenStore":
+        """讀取 path；不存在時嘗試從舊版 JSON 轉換；都沒有就回傳空的記錄"""
+        store = cls(capacity, width)
+        if os.path.exists(path) and os.path.getsize(path) >= HEADER.size:
+            try:
+                with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    magic, file_width, _, count = HEADER.unpack_from(mm, 0)
+                    if magic != MAGIC or file_width != width:
+                        raise ValueError(f"{path} 格式不符")
+                    count = min(count, (len(mm) - HEADER.size) // width)
+                    # 容量縮小時只保留最新的 capacity 筆
+                    for i in range(max(0, count - capacity), count):
+                        start = HEADER.size + i * width
+                        store.add(mm[start:start + width])
+                return store
+            except (OSError, ValueError, struct.error) as e:
+                print(f"⚠️ 無法讀取 {path}，重新開始記錄: {e}")
+                store = cls(capacity, width)
+        if legacy_json and os.path.exists(legacy_json):
+            try:
+                with open(legacy_json, "r") as f:
+                    hashes = json.load(f)
+                for hex_hash in hashes:
+                    store.add(bytes.fromhex(hex_hash)[:width])
+                print(f"🔄 已從 {legacy_json} 轉換 {len(store)} 筆記錄")
+            except Exception as e:
+                print(f"⚠️ 無法轉換 {legacy_json}: {e}")
+        return store
+
+    def save(self, path: str):
+        """依舊到新寫出，先寫暫存檔再替換，避免寫到一半的檔案"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, self.width, self.capacity, len(self._index)))
+            for digest in self:
+                f.write(digest)
+        os.replace(tmp, path)
+
+
+def filter_seen(items: list[dict], seen: SeenStore) -> list[dict]:
+    """過濾掉標題已推播過的新聞"""
+    return [item for item in items if title_digest(item["title"]) not in seen]
+
+
+def mark_seen(items: list[dict], seen: SeenStore):
+    for item in items:
+        seen.add(title_digest(item["title"]))
@@ -0,0 +1,126 @@
+"""
+訂閱者的分類偏好與摘要組裝
+
+依收件者的分類偏好組裝摘要，LLM 費用不隨訂閱人數成長：
+  - TELEGRAM_PREFERENCES 設定各 chat_id 要看的分類，以分類名稱的片段比對（「AI」對應「🤖 AI 新聞」），
+    沒列出的收件者收到全部分類
+  - group() 把偏好相同的收件者歸成一組，簽章（signature）是依 feeds.toml 順序排列的分類 tuple
+  - 每個分類一次執行只摘要一次，而且只摘要至少有一位收件者要看的分類
+  - Digest 保存各分類的段落，render(簽章) 組裝該組的摘要，結果依簽章快取：
+    LLM 費用與分類數成正比，組裝次數與偏好組合數成正比，都與訂閱人數無關
+
+設定（環境變數）：
+  TELEGRAM_PREFERENCES  例如 "111=AI,財經;222=台灣,國際"（收件者之間以分號分隔，分類片段以逗號分隔）
+"""
+import re
+
+from botcore import metrics
+from botcore.config import settings
+
+
+def parse_preferences(raw: str, categories: list[str]) -> dict[str, tuple[str, ...]]:
+    """chat_id → 要看的分類（依 categories 的順序）；格式錯誤時丟出 ValueError，對不到分類的片段略過"""
+    preferences = {}
+    for entry in filter(None, (part.strip() for part in raw.split(";"))):
+        chat_id, sep, wanted = entry.partition("=")
+        if not sep:
+            raise ValueError(f"TELEGRAM_PREFERENCES 格式錯誤：{entry!r}（應為 chat_id=分類,分類）")
+        chosen = set()
+        for term in filter(None, (term.strip() for term in wanted.split(","))):
+            matched = [category for category in categories if term.lower() in category.lower()]
+            if not matched:
+                # 兩個新聞 Bot 的分類不完全相同（科技新聞只有免費版有），共用同一份設定時不當成錯誤
+                print(f"⚠️ TELEGRAM_PREFERENCES：{chat_id.strip()} 的「{term}」對不到這個 Bot 的任何分類，略過")
+            chosen.update(matched)
+        preferences[chat_id.strip()] = tuple(category for category in categories if category in chosen)
+    return preferences
+
+
+def group(chat_ids: list[str], preferences: dict[str, tuple[str, ...]],
+          categories: list[str]) -> dict[tuple[str, ...], list[str]]:
+    """簽章 → 收件者；沒設定偏好的收件者看全部分類"""
+    groups = {}
+    for chat_id in chat_ids:
+        groups.setdefault(preferences.get(chat_id, tuple(categories)), []).append(chat_id)
+    return groups
+
+
+def from_settings(categories: list[str]) -> dict[tuple[str, ...], list[str]]:
+    """依 TELEGRAM_CHAT_ID 與 TELEGRAM_PREFERENCES 分組"""
+    return group(settings.telegram_chat_ids, parse_preferences(settings.telegram_preferences, categories), categories)
+
+
+def wanted(groups: dict[tuple[str, ...], list[str]]) -> set[str]:
+    """至少有一位收件者要看的分類"""
+    return {category for signature in groups for category in signature}
+
+
+class Digest:
+    """
+    一次執行的摘要：開頭（標題）、各分類段落、結尾（例如鼓勵的話）。
+    render(簽章) 依簽章快取，同樣偏好的收件者不論幾位都只組裝一次
+    """
+
+    def __init__(self, header: str, sections: dict[str, str], footer: str = ""):
+        self.header   = header
+        self.sections = sections
+        self.footer   = footer
+        self._cache   = {}
+
+    @classmethod
+    def from_text(cls, text: str, categories: list[str]) -> "Digest":
+        """
+        把一次產生全部分類的摘要（news_bot）依分類標題切開：以空行分段，
+        第一行含分類名稱（不比對開頭的 emoji，LLM 常省略或換掉）的段落開始一個分類，
+        接在後面的條列段落屬於同一分類，其餘段落依位置歸為開頭或結尾。
+        有任何一個分類找不到標題時整份當成開頭，所有收件者都收到完整摘要：
+        寧可多送，也不要把沒切出來的分類混進結尾送給沒訂閱的人
+        """
+        names = {c: re.sub(r"^\W+", "", c).strip() or c for c in categories}
+        header, sections, footer, current = [], {}, [], None
+        for paragraph in re.split(r"\n\s*\n", text.strip()):
+            first = paragraph.lstrip().split("\n", 1)[0]
+            category = None if first.startswith("•") else next((c for c in categories if names[c] in first), None)
+            if category is not None and category not in sections:
+                current = category
+                sections[current] = paragraph.strip()
+            elif current is None:
+                header.append(paragraph)
+            elif paragraph.lstrip().startswith("•") and not footer:
+                sections[current] += "\n\n" + paragraph.strip()
+            else:
+                footer.append(paragraph)
+        missing = [c for c in categories if c not in sections]
+        if missing:
+            print(f"⚠️ 摘要裡找不到分類標題 {missing}，所有收件者改收完整摘要")
+            return cls(text.strip(), {})
+        return cls("\n\n".join(header), sections, "\n\n".join(footer))
+
+    def render(self, signature: tuple[str, ...]) -> str:
+        """組裝 signature 裡有內容的分類；一個都沒有時回傳空字串（該組這次不推播）"""
+        if signature in self._cache:
+            metrics.inc("digest_render_hits")
+            return self._cache[signature]
+        metrics.inc("digest_renders")
+        if not self.sections:
+            text = self.header
+        else:
+            parts = [self.sections[c] for c in signature if c in self.sections]
+            text  = "\n\n".join(filter(None, [self.header] + parts + [self.footer])) if parts else ""
+        self._cache[signature] = text
+        return text
+
+    def batches(self, groups: dict[tuple[str, ...], list[str]]) -> list[tuple[list[str], str]]:
+        """給 Notifier.send_each 的 (收件者, 摘要)；訂閱的分類都沒有新聞的組別略過"""
+        batches, skipped = [], []
+        for signature, chat_ids in groups.items():
+            text = self.render(signature)
+            if text:
+                batches.append((chat_ids, text))
+            else:
+                skipped += chat_ids
+        if skipped:
+            print(f"ℹ️ {len(skipped)} 位收件者訂閱的分類這次沒有新聞，不推播")
+        if len(groups) > 1:
+            print(f"🧩 {len(groups)} 種分類偏好，摘要組裝 {len(self._cache)} 次")
+        return batches
@@ -0,0 +1,140 @@
+"""
+LLM 摘要呼叫（四個 Bot 共用）
+
+每個 Bot 原本都有一份「組 payload → 串流 → 查 LLM 快取」的程式，這裡整理成三種 summariser，
+呼叫方式相同：summariser(system, prompt, label=..., stop_when=..., validate=...) → 文字
+  - OpenAIChat：Chat Completions
+  - OpenAIResponses：Responses API，可帶 tools（例如 web_search_preview）
+  - Gemini：streamGenerateContent，受 RateLimiter 限速（RPM / TPM），429 / 5xx 自動退避重試
+都會先查 LLM 快取（cache key 與原本各 Bot 的寫法相同，既有的快取仍然有效），
+API key 與 base URL 在呼叫時才從 config.settings 讀取。
+"""
+import os
+import re
+import threading
+
+from botcore import llm_stream, prompt_budget, rate_limit
+from botcore.config import settings
+from botcore.llm_cache import cache as llm_cache
+
+
+def strip_code_fence(raw: str) -> str:
+    """去掉 LLM 常加的 ```json 包裹"""
+    raw = re.sub(r'^```json?\s*\n?', '', raw.strip())
+    return re.sub(r'\n?```\s*$', '', raw.strip())
+
+
+class OpenAIChat:
+    def __init__(self, model: str = "gpt-4o-mini", max_tokens: int = 2048, timeout: float = 120, label: str | None = None):
+        self.model      = model
+        self.max_tokens = max_tokens
+        self.timeout    = timeout   # 串流模式下是「多久沒收到新資料」的閒置時限
+        self.label      = label or model
+
+    def __call__(self, system: str, prompt: str, *, label: str | None = None, stop_when=None, validate=None) -> str:
+        def request() -> str:
+            return llm_stream.stream_text(
+                f"{settings.openai_base_url}/chat/completions",
+                {
+                    "model": self.model,
+                    "max_tokens": self.max_tokens,
+                    "stream": True,
+                    "messages": [
+                        {"role": "system", "content": system},
+                        {"role": "user",   "content": prompt},
+                    ],
+                },
+                llm_stream.openai_chat_delta,
+                headers={"Authorization": f"Bearer {settings.openai_api_key}"},
+                timeout=self.timeout,
+                stop_when=stop_when,
+                label=label or self.label,
+            )
+
+        return llm_cache.cached_call(
+            request, model=self.model, system=system, prompt=prompt,
+            config={"max_tokens": self.max_tokens}, validate=validate,
+        )
+
+
+class OpenAIResponses:
+    def __init__(self, model: str = "gpt-4o-mini", tools: list[dict] | None = None, timeout: float = 120, label: str | None = None):
+        self.model   = model
+        self.tools   = tools or []
+        self.timeout = timeout
+        self.label   = label or model
+
+    def __call__(self, system: str, prompt: str, *, label: str | None = None, stop_when=None, validate=None) -> str:
+        def request() -> str:
+            text = llm_stream.stream_text(
+                f"{settings.openai_base_url}/responses",
+                {
+                    "model": self.model,
+                    "tools": self.tools,
+                    "stream": True,
+                    "input": [
+                        {"role": "system", "content": system},
+                        {"role": "user",   "content": prompt},
+                    ],
+                },
+                llm_stream.openai_responses_delta,
+                headers={"Authorization": f"Bearer {settings.openai_api_key}"},
+                timeout=self.timeout,
+                stop_when=stop_when,
+                label=label or self.label,
+            )
+            if not text:
+                raise RuntimeError("OpenAI Responses API 沒有回傳任何 output_text")
+            return text
+
+        return llm_cache.cached_call(
+            request, model=self.model, system=system, prompt=prompt,
+            config={"tools": [tool["type"] for tool in self.tools]}, validate=validate,
+        )
+
+
+class Gemini:
+    def __init__(self, model: str = "gemini-2.5-flash", max_output_tokens: int = 2048, timeout: float = 60,
+                 limiter: rate_limit.RateLimiter | None = None):
+        self.model    = model
+        self.config   = {"maxOutputTokens": max_output_tokens}
+        self.timeout  = timeout
+        self._limiter = limiter
+        self._lock    = threading.Lock()
+
+    @property
+    def limiter(self) -> rate_limit.RateLimiter:
+        """免費方案每分鐘 10 次請求、25 萬 token（GEMINI_RPM / GEMINI_TPM），第一次呼叫時才建立"""
+        with self._lock:
+            if self._limiter is None:
+                self._limiter = rate_limit.RateLimiter(
+                    int(os.environ.get("GEMINI_RPM", "10")),
+                    int(os.environ.get("GEMINI_TPM", "250000")),
+                )
+            return self._limiter
+
+    def __call__(self, system: str, prompt: str, *, label: str = "Gemini", stop_when=None, validate=None) -> str:
+        full_prompt = system + "\n\n" + prompt
+        payload = {
+            "contents": [{"parts": [{"text": full_prompt}]}],
+            "generationConfig": self.config,
+        }
+
+        def request() -> str:
+            url = (
+                f"{settings.gemini_base_url}/models/{self.model}:streamGenerateContent"
+                f"?alt=sse&key={settings.gemini_api_key}"
+            )
+            return llm_stream.stream_text(url, payload, llm_stream.gemini_delta,
+                                          timeout=self.timeout, stop_when=stop_when, label=label)
+
+        def limited_request() -> str:
+            # TPM 以輸入估算 + 輸出上限計算，寧可保守一點
+            tokens = prompt_budget.estimate_tokens(full_prompt) + self.config["maxOutputTokens"]
+            return rate_limit.call_with_retry(request, label="Gemini", limiter=self.limiter, tokens=tokens)
+
+        # 先查快取：同一天重跑（或手動測試）直接回傳，不占用速率額度
+        return llm_cache.cached_call(
+            limited_request, model=self.model, system=system, prompt=prompt,
+            config=self.config, validate=validate,
+        )
@@ -0,0 +1,288 @@
+"""
+Telegram 推播（多位收件者同時發送）
+
+四個 Bot 共用的推播：
+  - 所有 chat_id 同時發送（執行緒池），同一位收件者的多則訊息依序送出
+  - 遵守 Telegram 的速率限制：全域每秒約 30 則、同一個 chat 每秒 1 則（令牌桶，先預約再等待）
+  - 429 依 API 回傳的 retry_after 等待後重試，5xx / 網路錯誤以指數退避重試
+  - HTML 解析失敗（400）時可改送純文字（plain_fallback），某位收件者失敗不影響其他人
+  - 超過 4096 字的訊息依分類（空行）→ 條列（換行）→ 字詞的順序切成多則，
+    不會切斷 HTML 標籤，跨則的 <b>、<a> 等會在前一則補上結尾、下一則重新開啟
+  - 每位收件者的結果印在 log，並寫入 state/telegram_delivery.json
+  - Notifier 綁定 Bot token 與收件者（預設在發送時才從 config.settings 讀取），四個 Bot 共用
+  - deliver / Notifier.send_each：不同組收件者收到不同內容（依分類偏好組裝的摘要，botcore.subscribers），仍然同時發送
+
+設定（環境變數）：
+  TELEGRAM_CONCURRENCY      同時發送的收件者數（預設 30，與全域速率相同才不會卡在單一 chat 的等待）
+  TELEGRAM_GLOBAL_RATE      全域每秒訊息數（預設 30）
+  TELEGRAM_PER_CHAT_RATE    每個 chat 每秒訊息數（預設 1）
+  TELEGRAM_REPORT_PATH      推播結果檔位置（預設 state/telegram_delivery.json）
+  TELEGRAM_API_BASE         API 位址（預設 https://api.telegram.org，基準測試時指向本機模擬伺服器）
+"""
+import os
+import re
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.error import HTTPError
+
+from botcore import metrics, rate_limit
+from botcore.config import STATE_DIR, settings
+from botcore.http_pool import client as http_client
+
+API_PATH       = "/bot{token}/sendMessage"
+DEFAULT_REPORT = os.path.join(STATE_DIR, "telegram_delivery.json")
+CONCURRENCY    = int(os.environ.get("TELEGRAM_CONCURRENCY", "30"))
+MAX_LENGTH     = 4096
+
+_TAG_RE = re.compile(r"<(/?)([a-zA-Z][a-zA-Z0-9-]*)[^>]*>")
+# 由粗到細的切法：分類（空行）、條列（換行）、字詞（空白）、單一字元（標籤與 &amp; 這類實體不拆開）
+_SPLITTERS = [
+    lambda text: re.findall(r"[^\n]*\n+|[^\n]+$", text),
+    lambda text: re.findall(r"\S+\s*|\s+", text),
+    lambda text: re.findall(r"<[^>]*>|&#?\w+;|.", text, re.DOTALL),
+]
+
+
+class TelegramLimiter:
+    """全域與每個 chat 各一個令牌桶；每次發送前 acquire(chat_id)"""
+
+    def __init__(self, global_per_sec: float, per_chat_per_sec: float):
+        self.global_bucket = rate_limit.TokenBucket(global_per_sec * 60, capacity=global_per_sec)
+        self.per_chat      = per_chat_per_sec
+        self._chats        = {}
+        self._lock         = threading.Lock()
+
+    def acquire(self, chat_id: str) -> float:
+        with self._lock:
+            bucket = self._chats.get(chat_id)
+            if bucket is None:
+                bucket = self._chats[chat_id] = rate_limit.TokenBucket(self.per_chat * 60, capacity=1)
+        wait = max(self.global_bucket.reserve(1), bucket.reserve(1))
+        if wait > 0:
+            metrics.observe("telegram_rate_wait_seconds", wait)
+            time.sleep(wait)
+        return wait
+
+
+# 整個程序共用一組限速（同一個 Bot token 的額度是共用的）
+limiter = TelegramLimiter(
+    float(os.environ.get("TELEGRAM_GLOBAL_RATE", "30")),
+    float(os.environ.get("TELEGRAM_PER_CHAT_RATE", "1")),
+)
+
+
+def to_plain(text: str) -> str:
+    """HTML 轉純文字：連結只留網址，其餘標籤去掉"""
+    plain = re.sub(r'<a href="([^"]+)">[^<]*</a>', r'\1', text)
+    return re.sub(r'<[^>]+>', '', plain)
+
+
+def _tg_len(text: str) -> int:
+    """Telegram 以 UTF-16 code unit 計算長度（emoji 算 2）；直接量含標籤的原文，比實際顯示長度保守"""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _open_tags(text: str) -> list[str]:
+    """text 結尾時仍未關閉的標籤（開啟標籤原文，由外到內）"""
+    stack = []
+    for match in _TAG_RE.finditer(text):
+        closing, name = match.group(1), match.group(2).lower()
+        if not closing:
+            stack.append((name, match.group(0)))
+            continue
+        for i in range(len(stack) - 1, -1, -1):
+            if stack[i][0] == name:
+                del stack[i:]
+                break
+    return [tag for _, tag in stack]
+
+
+def _close(text: str) -> str:
+    closers = [f"</{_TAG_RE.match(tag).group(2)}>" for tag in reversed(_open_tags(text))]
+    return text.rstrip() + "".join(closers)
+
+
+def split_message(text: str, limit: int = MAX_LENGTH) -> list[str]:
+    """把 HTML 訊息切成每則不超過 limit 字、標籤各自成對的多則訊息"""
+    text = text.strip()
+    if _tg_len(text) <= limit:
+        return [text] if text else []
+
+    chunks, current = [], ""
+
+    def add(piece: str, level: int):
+        nonlocal current
+        if _tg_len(_close(current + piece)) <= limit:
+            current += piece
+            return
+        if _TAG_RE.sub("", current).strip():
+            chunks.append(_close(current).strip())
+            current = "".join(_open_tags(current))   # 下一則重新開啟未關閉的標籤
+            piece   = piece.lstrip("\n")
+            if _tg_len(_close(current + piece)) <= limit:
+                current += piece
+                return
+        if level < len(_SPLITTERS):
+            for sub in _SPLITTERS[level](piece):
+                add(sub, level + 1)
+        else:
+            current += piece   # 單一字元或標籤，無法再切
+
+    for paragraph in re.findall(r".+?(?:\n\n+|$)", text, re.DOTALL):
+        add(paragraph, 0)
+    if _TAG_RE.sub("", current).strip():
+        chunks.append(_close(current).strip())
+    return chunks
+
+
+def describe_error(error: Exception) -> str:
+    """HTTPError 盡量附上 Telegram 回傳的 description"""
+    if isinstance(error, HTTPError):
+        try:
+            body = json.loads(error.read().decode("utf-8"))
+            return f"HTTP {error.code}: {body.get('description', '')}"
+        except Exception:
+            return f"HTTP {error.code}"
+    return str(error)
+
+
+def _post(url: str, chat_id: str, payload: dict, result: dict) -> dict:
+    """送出一則訊息（含限速與重試），attempts 累計在 result"""
+    def request() -> dict:
+        limiter.acquire(chat_id)
+        result["attempts"] += 1
+        data = http_client.post_json(url, payload, timeout=15)
+        if not data.get("ok"):
+            raise RuntimeError(f"Telegram API 錯誤: {data}")
+        return data
+
+    return rate_limit.call_with_retry(request, label=f"Telegram {chat_id}", base_delay=1.0, max_delay=30.0)
+
+
+def _deliver_one(url: str, chat_id: str, messages: list[str], disable_preview: bool, plain_fallback: bool) -> dict:
+    start  = time.monotonic()
+    result = {"chat_id": chat_id, "ok": False, "sent": 0, "total": len(messages), "attempts": 0, "fallback": False, "error": None}
+    for text in messages:
+        payload = {
+            "chat_id": chat_id,
+            "text": text,
+            "parse_mode": "HTML",
+            "disable_web_page_preview": disable_preview,
+        }
+        try:
+            _post(url, chat_id, payload, result)
+        except Exception as e:
+            # 只有 HTML 解析錯誤（400）改送純文字才有用；403（已封鎖 Bot）等錯誤直接記下
+            if not (plain_fallback and isinstance(e, HTTPError) and e.code == 400):
+                result["error"] = describe_error(e)
+                break
+            print(f"⚠️ Telegram HTML 發送失敗 ({chat_id}): {describe_error(e)}，改送純文字")
+            try:
+                _post(url, chat_id, {"chat_id": chat_id, "text": to_plain(text)}, result)
+                result["fallback"] = True
+            except Exception as e2:
+                result["error"] = describe_error(e2)
+                break
+        result["sent"] += 1
+    result["ok"]      = result["error"] is None
+    result["elapsed"] = round(time.monotonic() - start, 2)
+    return result
+
+
+def broadcast(token: str, chat_ids: list[str], messages: str | list[str], *, disable_preview: bool = True,
+              plain_fallback: bool = False, report_path: str | None = None, record: bool = True) -> list[dict]:
+    """
+    把 messages（一則或依序多則）同時推播給所有 chat_id，回傳每位收件者的結果。
+    超過長度上限的訊息先切成多則，每位收件者依序收到。不會丟出例外；失敗的收件者記在結果的 error
+    """
+    return deliver(token, [(chat_ids, messages)], disable_preview=disable_preview,
+                   plain_fallback=plain_fallback, report_path=report_path, record=record)
+
+
+def deliver(token: str, batches: list[tuple[list[str], str | list[str]]], *, disable_preview: bool = True,
+            plain_fallback: bool = False, report_path: str | None = None, record: bool = True) -> list[dict]:
+    """
+    batches 是 (chat_id 清單, messages) 的清單：每組收件者收到各自的內容，所有收件者同時發送。
+    同一份內容只切一次訊息；其餘與 broadcast 相同。
+    record 為 False 時不寫推播結果檔，由呼叫端把一次執行裡多次發送的結果合起來寫一次（write_report）
+    """
+    jobs = []
+    for chat_ids, messages in batches:
+        if isinstance(messages, str):
+            messages = [messages]
+        chunks = [chunk for message in messages for chunk in split_message(message)]
+        jobs  += [(chat_id, chunks) for chat_id in chat_ids]
+    url   = settings.telegram_api_base + API_PATH.format(token=token)
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, min(CONCURRENCY, len(jobs)))) as pool:
+        report = list(pool.map(
+            lambda job: _deliver_one(url, job[0], job[1], disable_preview, plain_fallback),
+            jobs,
+        ))
+    elapsed = time.monotonic() - start
+    metrics.observe("send_seconds", elapsed)
+
+    for r in report:
+        metrics.inc("telegram_recipients", status="ok" if r["ok"] else "failed")
+        metrics.inc("telegram_requests", r["attempts"])
+        if r["ok"]:
+            note = "（純文字 fallback）" if r["fallback"] else ""
+            print(f"✅ 訊息已發送到 {r['chat_id']}{note}（{r['sent']} 則，{r['attempts']} 次請求，{r['elapsed']:.1f} 秒）")
+        else:
+            print(f"⚠️ Telegram 發送失敗 (chat_id: {r['chat_id']}): {r['error']}（已送出 {r['sent']}/{r['total']} 則）")
+    ok     = sum(1 for r in report if r["ok"])
+    counts = sorted({r["total"] for r in report}) or [0]
+    per    = f"每人 {counts[0]} 則" if len(counts) == 1 else f"{len(batches)} 種內容、每人 {counts[0]}～{counts[-1]} 則"
+    print(f"📬 Telegram：{ok}/{len(report)} 位收件者成功，{per}，耗時 {elapsed:.1f} 秒")
+
+    if record:
+        write_report(report, elapsed, report_path)
+    return report
+
+
+def write_report(report: list[dict], elapsed: float, path: str | None = None):
+    path = path or os.environ.get("TELEGRAM_REPORT_PATH", DEFAULT_REPORT)
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "sent_at":    datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "elapsed":    round(elapsed, 2),
+                "recipients": report,
+            }, f, ensure_ascii=False, indent=2)
+    except OSError as e:
+        print(f"⚠️ 無法寫入推播結果 {path}: {e}")
+
+
+class Notifier:
+    """推播到固定的一組收件者；token 與 chat_ids 沒指定時，發送時才讀 TELEGRAM_BOT_TOKEN / TELEGRAM_CHAT_ID"""
+
+    def __init__(self, *, disable_preview: bool = True, plain_fallback: bool = False,
+                 token: str | None = None, chat_ids: list[str] | None = None):
+        self.disable_preview = disable_preview
+        self.plain_fallback  = plain_fallback
+        self.token           = token
+        self.chat_ids        = chat_ids
+
+    def send(self, messages: str | list[str], record: bool = True) -> list[dict]:
+        return broadcast(
+            self.token or settings.telegram_bot_token,
+            self.chat_ids or settings.telegram_chat_ids,
+            messages,
+            disable_preview=self.disable_preview,
+            plain_fallback=self.plain_fallback,
+            record=record,
+        )
+
+    def send_each(self, batches: list[tuple[list[str], str | list[str]]], record: bool = True) -> list[dict]:
+        """每組收件者收到各自的內容（見 deliver）；不使用 Notifier 綁定的收件者"""
+        return deliver(
+            self.token or settings.telegram_bot_token,
+            batches,
+            disable_preview=self.disable_preview,
+            plain_fallback=self.plain_fallback,
+            record=record,
+        )
@@ -0,0 +1,52 @@
+"""
+新聞標題與摘要的文字正規化
+
+把 feed 的標題與摘要整理成一致的純文字，不同來源的同一則新聞得到相同的文字（title_digest、近似重複都依此比對）：
+  - 正規表示式預先編譯；標籤逐段跳過，可見文字湊滿 limit 字就停止，不處理後面的 HTML
+  - script / style / 註解整段去掉，CDATA 只去掉標記保留內容，區塊標籤（p、br、li…）換成空白
+  - 解碼 HTML 實體；全形英數轉半形（中文標點不動），各種空白（全形空白、&nbsp;、換行）收成一個半形空白
+"""
+import re
+from html import unescape
+
+DESCRIPTION_LIMIT = 300   # 摘要保留的可見字數
+
+_TAG_RE  = re.compile(
+    r"<!--.*?(?:-->|$)|<!\[CDATA\[|\]\]>|<(script|style)\b.*?(?:</\1\s*>|$)"
+    r"|<(/?(?:p|br|div|li|ul|ol|h[1-6]|tr|td|blockquote|figure|figcaption|section|article)\b)?[^>]*>",
+    re.DOTALL | re.IGNORECASE,
+)
+_WIDE_RE = re.compile(r"[０-９Ａ-Ｚａ-ｚ]")
+# 全形英數 → 半形；全形標點（，。！？）是中文的正常寫法，保留
+_WIDTH = {code: code - 0xFEE0 for start, end in ((0xFF10, 0xFF19), (0xFF21, 0xFF3A), (0xFF41, 0xFF5A))
+          for code in range(start, end + 1)}
+
+
+def normalize_text(text: str) -> str:
+    """解碼 HTML 實體、全形英數轉半形、空白收成一個；標題與摘要共用"""
+    if "&" in text:
+        text = unescape(text)
+    if _WIDE_RE.search(text):   # translate 逐字查表較慢，大多數文字沒有全形英數，先檢查
+        text = text.translate(_WIDTH)
+    return " ".join(text.split())   # str.split() 也會切全形空白與 &nbsp;，比正規表示式快
+
+
+def clean_html(raw: str, limit: int = DESCRIPTION_LIMIT) -> str:
+    """HTML 摘要轉成純文字，最多 limit 字；湊滿 limit 字就不再往後處理"""
+    if "<" not in raw and "]]>" not in raw:
+        return normalize_text(raw)[:limit]
+    parts, pos, size, check = [], 0, 0, limit
+    for m in _TAG_RE.finditer(raw):
+        parts.append(raw[pos:m.start()])
+        if m.group(2):   # 區塊標籤：段落之間要有空白
+            parts.append(" ")
+        size += m.start() - pos
+        pos   = m.end()
+        # 原始字數只會比解碼、收空白後多，超過 limit 才需要實際算一次可見字數
+        if size >= check:
+            text = normalize_text("".join(parts))
+            if len(text) >= limit:
+                return text[:limit]
+            check = size + limit - len(text)
+    parts.append(raw[pos:])
+    return normalize_text("".join(parts))[:limit]
@@ -3,76 +3,43 @@
 
 新聞分類：台灣綜合 · 國際 · 科技 · AI · 娛樂休閒 · 財經
 AI 摘要：Google Gemini 2.5 Flash（免費方案，每分鐘 10 次，每天 500 次請求）
-推播方式：Telegram（支援多人）
+推播方式：Telegram（支援多人，每人可只訂閱部分分類：TELEGRAM_PREFERENCES）
 排程觸發：Cloudflare Workers Cron → GitHub Actions（每天台灣時間 08:00）
 
 過濾機制：
-  - 日期過濾：只保留當天新聞（英文來源不受時區影響）
+  - 日期過濾：只保留當天新聞（外國來源保留最近 24 小時，回溯時間在 feeds.toml 設定）
   - 去重複：跨天記錄已推播標題，避免重複出現
   - 黑名單：TITLE_BLACKLIST 關鍵字直接過濾
   - 手動測試模式：workflow_dispatch 觸發時不寫入記錄，方便反覆測試
+  - 增量模式：INCREMENTAL=true 時只處理各來源上一版之後的新聞，一天可以發多版（EDITION 為版次名稱）
 """
 
-import os
-import json
-import re
-import hashlib
-import xml.etree.ElementTree as ET
-from datetime import datetime, timezone, timedelta
-from email.utils import parsedate_to_datetime
-from urllib.request import urlopen, Request
-from urllib.parse import quote
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 
-# ─── 設定 ───────────────────────────────────────────────
-TELEGRAM_BOT_TOKEN = os.environ["TELEGRAM_BOT_TOKEN"]
-TELEGRAM_CHAT_IDS = [cid.strip() for cid in os.environ["TELEGRAM_CHAT_ID"].split(",")]
-GEMINI_API_KEY = os.environ["GEMINI_API_KEY"]
-
-# 台灣時間
-TW_TZ = timezone(timedelta(hours=8))
+from botcore import dedup, high_water, llm_stream, metrics, prompt_budget, registry, runner, subscribers, summarise, telegram
+from botcore.config import LEGACY_SEEN_FILE, NEAR_DUP_FILE, SEEN_FILE, TW_TZ, MissingSetting, flag, settings
+from botcore.archive import archive
+from botcore.feeds import FeedFetcher, load_feed_cache, save_feed_cache
+from botcore.seen_store import SeenStore, mark_seen
 
-# 手動觸發模式（workflow_dispatch）→ 不做去重複，方便測試
-IS_MANUAL = os.environ.get("IS_MANUAL", "false").lower() == "true"
+# ─── 設定 ───────────────────────────────────────────────
+# 密鑰（TELEGRAM_BOT_TOKEN、TELEGRAM_CHAT_ID、GEMINI_API_KEY）與手動觸發模式（IS_MANUAL）
+# 都在用到時才由 config.settings 讀取，import 這個模組不需要任何環境變數
+# TELEGRAM_PROGRESSIVE=true 時逐分類推播：每個分類摘要完成（且排在前面的分類都已送出）就先發一則，不等全部完成
 
 # ─── RSS 新聞來源 ────────────────────────────────────────
-RSS_FEEDS = {
-    "🇹🇼 台灣綜合": [
-        "https://news.ltn.com.tw/rss/all.xml",
-        "https://feeds.feedburner.com/ettoday/global",
-    ],
-    "🌍 國際新聞": [
-        "https://news.ltn.com.tw/rss/world.xml",
-        "https://udn.com/rssfeed/news/2/WORLD?ch=news",
-    ],
-    "💻 科技新聞": [
-        "https://feeds.feedburner.com/ithome",
-        "https://technews.tw/feed/",
-    ],
-    "🤖 AI 新聞": [
-        # 英文科技媒體
-        "https://www.theverge.com/rss/ai-artificial-intelligence/index.xml",  # The Verge AI
-        "https://venturebeat.com/category/ai/feed/",                           # VentureBeat AI
-        "https://techcrunch.com/tag/artificial-intelligence/feed/",            # TechCrunch AI
-        # 美國大廠官方 Blog
-        "https://openai.com/news/rss.xml",                                     # OpenAI 官方
-        "https://blog.google/technology/ai/rss/",                              # Google AI Blog
-        "https://deepmind.google/blog/rss.xml",                                # Google DeepMind
-        "https://huggingface.co/blog/feed.xml",                                # HuggingFace Blog
-        # 新加坡與亞太
-        "https://www.channelnewsasia.com/rssfeeds/8395744",                    # CNA Science & Tech
-    ],
-    "💰 財經新聞": [
-        "https://news.ltn.com.tw/rss/business.xml",
-        "https://udn.com/rssfeed/news/2/FINANCE?ch=news",
-    ],
-    "🎭 娛樂休閒": [
-        "https://news.ltn.com.tw/rss/entertainment.xml",
-        "https://star.ettoday.net/rss.xml",
-    ],
-}
-
-MAX_ITEMS_PER_FEED = 20  # 多抓一些，過濾日期後再限制數量
-MAX_ITEMS_PER_FEED_FINAL = 5  # 過濾後每個來源最多保留幾則
+# 來源、分類順序、回溯時間、則數上限與最短輪詢間隔都寫在 feeds.toml（botcore.registry）
+FEEDS = registry.load("news_bot_gemini")
+
+# ─── Gemini 速率限制 ─────────────────────────────────────
+# 免費方案：每分鐘 10 次請求、25 萬 token（GEMINI_RPM / GEMINI_TPM）。各分類同時送出，由令牌桶排隊，不再固定 sleep
+GEMINI_CONCURRENCY = 6  # 同時進行的分類數
+PIPELINE_QUEUE_SIZE = 4  # 管線各段之間的佇列長度上限
+MAX_BULLETS = 5  # 每個分類最多幾則摘要（與 prompt 的「挑出 3~5 則」一致）
 
 # ─── 黑名單（標題含這些關鍵字的新聞直接跳過）─────────────
 TITLE_BLACKLIST = [
@@ -80,169 +47,32 @@ TITLE_BLACKLIST = [
     "權力遊戲",
 ]
 
-SEEN_FILE = "seen_titles.json"  # 由 GitHub Actions Cache 跨天保留
-
-
-# ─── 去重複機制 ──────────────────────────────────────────
-def title_hash(title: str) -> str:
-    """將標題轉成短 hash，避免存太長的字串"""
-    return hashlib.md5(title.strip().encode("utf-8")).hexdigest()
-
-
-def load_seen() -> set:
-    """讀取已推播過的標題 hash"""
-    if os.path.exists(SEEN_FILE):
-        try:
-            with open(SEEN_FILE, "r") as f:
-                return set(json.load(f))
-        except Exception:
-            pass
-    return set()
-
-
-def save_seen(seen: set):
-    """儲存已推播的標題 hash（只保留最近 500 筆，避免無限膨脹）"""
-    seen_list = list(seen)[-500:]
-    with open(SEEN_FILE, "w") as f:
-        json.dump(seen_list, f)
-
-
-def filter_seen(items: list[dict], seen: set) -> list[dict]:
-    """過濾掉已推播過的新聞"""
-    return [item for item in items if title_hash(item["title"]) not in seen]
 
-
-def mark_seen(items: list[dict], seen: set):
-    """將本次推播的標題加入 seen"""
-    for item in items:
-        seen.add(title_hash(item["title"]))
-
-
-def is_today(pub_date_str: str) -> bool:
-    """判斷發布日期是否為今天（台灣時間）。無法解析時回傳 True（保留該則新聞）。"""
-    if not pub_date_str:
-        return True
-    try:
-        # RSS 2.0 的 pubDate 格式：RFC 2822，例如 "Mon, 24 Feb 2026 01:00:00 +0800"
-        pub_dt = parsedate_to_datetime(pub_date_str)
-        pub_tw = pub_dt.astimezone(TW_TZ)
-        today_tw = datetime.now(TW_TZ).date()
-        return pub_tw.date() == today_tw
-    except Exception:
-        return True  # 解析失敗時保留，不誤殺
-
-
-# ─── 工具函式 ────────────────────────────────────────────
-def fetch_url(url: str, timeout: int = 15) -> str:
-    """取得網頁內容"""
-    req = Request(url, headers={"User-Agent": "Mozilla/5.0 DailyNewsBot/1.0"})
-    with urlopen(req, timeout=timeout) as resp:
-        return resp.read().decode("utf-8", errors="replace")
-
-
-def parse_rss(xml_text: str, max_items: int = MAX_ITEMS_PER_FEED, skip_date_filter: bool = False) -> list[dict]:
-    """解析 RSS/Atom feed，回傳 [{title, link, description}]。skip_date_filter=True 時不過濾日期（用於英文來源）"""
-    items = []
-    try:
-        root = ET.fromstring(xml_text)
-    except ET.ParseError:
-        return items
-
-    # 處理不同的 namespace
-    ns = {"atom": "http://www.w3.org/2005/Atom"}
-
-    # RSS 2.0
-    for item in root.findall(".//item")[:max_items]:
-        pub_date = item.findtext("pubDate", "").strip()
-        if not skip_date_filter and not is_today(pub_date):
-            continue  # ← 跳過非今天的新聞
-
-        title = item.findtext("title", "").strip()
-        if any(kw in title for kw in TITLE_BLACKLIST):
-            continue  # ← 黑名單過濾
-        link = item.findtext("link", "").strip()
-        desc = item.findtext("description", "").strip()
-        desc = re.sub(r"<[^>]+>", "", desc)[:300]
-        if title:
-            items.append({"title": title, "link": link, "description": desc})
-
-    # Atom feed
-    if not items:
-        for entry in root.findall(".//atom:entry", ns)[:max_items]:
-            # Atom 的日期欄位是 <updated> 或 <published>
-            pub_date = (
-                entry.findtext("atom:published", "", ns)
-                or entry.findtext("atom:updated", "", ns)
-            ).strip()
-
-            # Atom 日期格式是 ISO 8601，需要另外解析
-            if pub_date and not skip_date_filter:
-                try:
-                    pub_dt = datetime.fromisoformat(pub_date.replace("Z", "+00:00"))
-                    pub_tw = pub_dt.astimezone(TW_TZ)
-                    today_tw = datetime.now(TW_TZ).date()
-                    if pub_tw.date() != today_tw:
-                        continue  # ← 跳過非今天的新聞
-                except Exception:
-                    pass  # 解析失敗就保留
-
-            title = entry.findtext("atom:title", "", ns).strip()
-            if any(kw in title for kw in TITLE_BLACKLIST):
-                continue  # ← 黑名單過濾
-            link_el = entry.find("atom:link", ns)
-            link = link_el.get("href", "") if link_el is not None else ""
-            desc = entry.findtext("atom:summary", "", ns).strip()
-            desc = re.sub(r"<[^>]+>", "", desc)[:300]
-            if title:
-                items.append({"title": title, "link": link, "description": desc})
-
-    return items[:MAX_ITEMS_PER_FEED_FINAL]
-
-
-# 英文來源不做日期過濾（因為美國時間比台灣晚，早上跑時文章日期還是昨天）
-EN_FEEDS = {
-    "https://www.theverge.com/rss/ai-artificial-intelligence/index.xml",
-    "https://venturebeat.com/category/ai/feed/",
-    "https://techcrunch.com/tag/artificial-intelligence/feed/",
-    "https://openai.com/news/rss.xml",
-    "https://blog.google/technology/ai/rss/",
-    "https://deepmind.google/blog/rss.xml",
-    "https://huggingface.co/blog/feed.xml",
-    "https://www.channelnewsasia.com/rssfeeds/8395744",
-    "https://udn.com/rssfeed/news/2/WORLD?ch=news",
-    "https://udn.com/rssfeed/news/2/FINANCE?ch=news",
-    "https://star.ettoday.net/rss.xml",
-}
-
-
-def fetch_all_news(seen: set) -> dict[str, list[dict]]:
-    """抓取所有分類的新聞，並過濾已推播過的標題"""
-    all_news = {}
-    for category, feeds in RSS_FEEDS.items():
-        category_items = []
-        for feed_url in feeds:
-            try:
-                xml_text = fetch_url(feed_url)
-                skip_date = feed_url in EN_FEEDS  # 英文來源不做日期過濾
-                fetched = parse_rss(xml_text, skip_date_filter=skip_date)
-                if not IS_MANUAL:
-                    fetched = filter_seen(fetched, seen)  # ← 自動排程才去重複
-                print(f"  📌 {feed_url} → {len(fetched)} 則")
-                category_items.extend(fetched)
-            except Exception as e:
-                print(f"⚠️ 無法抓取 {feed_url}: {e}")
-        all_news[category] = category_items
-    return all_news
+# ─── 元件 ────────────────────────────────────────────────
+fetcher = FeedFetcher(
+    registry.to_sources(FEEDS, TITLE_BLACKLIST),
+    max_workers=8,  # 同時抓取的來源數
+    per_host=2,  # 同一網站同時連線數上限（自由時報有 4 個 feed，避免被擋）
+    deadline=60,  # 整體抓取時限（秒），逾時的來源直接放棄，不拖累整個排程
+    archive=archive,  # 每個分類抓完就寫進新聞存檔（state/archive.sqlite3）
+)
+summariser = summarise.Gemini("gemini-2.5-flash", max_output_tokens=2048)
+notifier = telegram.Notifier(disable_preview=True)
 
 
 def build_category_prompt(category: str, items: list[dict]) -> str:
-    """為單一分類組合 prompt（分批呼叫，降低 token 量）"""
+    """為單一分類組合 prompt（分批呼叫，降低 token 量；新聞內容以 PROMPT_TOKEN_BUDGET 為上限）"""
     today = datetime.now(TW_TZ).strftime("%Y/%m/%d (%A)")
-    news_text = ""
-    for i, item in enumerate(items, 1):
-        news_text += f"{i}. {item['title']}\n"
-        if item["description"]:
-            news_text += f"   {item['description']}\n"
+    budget = settings.prompt_token_budget
+    with metrics.timer("prompt_build_seconds", category=category):
+        packed, stats = prompt_budget.pack_items(items, budget, fetcher.sources.feeds.get(category, []))
+    metrics.inc("prompt_tokens", stats["used"], category=category)
+    metrics.inc("prompt_tokens_dropped", stats["dropped_tokens"], category=category)
+    print(
+        f"  🧮 {category}：{len(packed)}/{len(items)} 則，約 {stats['used']}/{budget} tokens"
+        f"（{stats['trimmed']} 則只放標題，捨棄 {stats['dropped']} 則、約 {stats['dropped_tokens']} tokens）"
+    )
+    news_text = "".join(prompt_budget.render_item(i, item) for i, item in enumerate(packed, 1))
 
     return f"""你是一位專業的繁體中文新聞編輯。以下是今天（{today}）{category}的新聞。
 挑出 3~5 則最重要的，用一句話摘要，只輸出以下格式，不要其他說明：
@@ -254,113 +84,250 @@ def build_category_prompt(category: str, items: list[dict]) -> str:
 {news_text}"""
 
 
-def call_ai(prompt: str) -> str:
-    """呼叫 Google Gemini API 取得摘要（免費方案，含 429 自動重試）"""
-    system = "你是一位專業的繁體中文新聞編輯。"
-    full_prompt = system + "\n\n" + prompt
+def call_ai(prompt: str, label: str = "Gemini") -> str:
+    """呼叫 Gemini 取得摘要（先查 LLM 快取；限速與重試由 summarise.Gemini 處理），第 MAX_BULLETS 則摘要寫完就提早結束串流"""
+    return summariser("你是一位專業的繁體中文新聞編輯。", prompt, label=label,
+                      stop_when=llm_stream.BulletsDone(MAX_BULLETS))
 
-    body = json.dumps({
-        "contents": [{"parts": [{"text": full_prompt}]}],
-        "generationConfig": {"maxOutputTokens": 2048},
-    }).encode("utf-8")
 
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={GEMINI_API_KEY}"
+def summarise_category(category: str, prompt: str) -> tuple[str, float]:
+    """在背景執行緒呼叫 Gemini 摘要單一分類，回傳 (摘要, 耗時秒數)"""
+    start = time.monotonic()
+    result = call_ai(prompt, label=f"Gemini {category}")
+    return result, time.monotonic() - start
 
-    max_retries = 3
-    wait_seconds = 60
 
-    for attempt in range(1, max_retries + 1):
-        try:
-            req = Request(
-                url,
-                data=body,
-                headers={"Content-Type": "application/json"},
-                method="POST",
-            )
-            with urlopen(req, timeout=60) as resp:
-                data = json.loads(resp.read().decode())
-            return data["candidates"][0]["content"]["parts"][0]["text"]
-        except Exception as e:
-            if "429" in str(e) and attempt < max_retries:
-                print(f"  ⏳ Gemini rate limit，等待 {wait_seconds} 秒後重試（第 {attempt}/{max_retries - 1} 次）...")
-                import time
-                time.sleep(wait_seconds)
-            else:
-                raise
+def send_telegram(text: str):
+    """同時發送訊息到所有 Telegram 用戶（遵守 Telegram 速率限制，429 / 網路錯誤自動重試）"""
+    notifier.send(text)
 
 
-def send_telegram(text: str):
-    """發送訊息到所有 Telegram 用戶"""
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+def send_digest(digest: subscribers.Digest, groups: dict[tuple[str, ...], list[str]]):
+    """每種分類偏好的收件者收到各自組裝的摘要（每種偏好只組裝一次）"""
+    notifier.send_each(digest.batches(groups))
+
 
-    for chat_id in TELEGRAM_CHAT_IDS:
-        body = json.dumps({
-            "chat_id": chat_id,
-            "text": text,
-            "parse_mode": "HTML",
-            "disable_web_page_preview": True,
-        }).encode("utf-8")
+# ─── 管線：抓取 → 摘要 → 推播 ────────────────────────────
+# 三段各自在自己的執行緒執行，以有長度上限的 queue 串接（None 代表上一段結束）：
+# 某個分類的來源一抓完就送去摘要，網路等待、Gemini 延遲與推播彼此重疊
+class Pipeline:
+    """三段共用：記下各段的例外；任何一段出錯就 cancel，其他段不再等待 queue，由 main 重新丟出"""
 
-        req = Request(url, data=body, headers={"Content-Type": "application/json"}, method="POST")
+    def __init__(self):
+        self.cancel = threading.Event()
+        self.errors = []
 
+    def thread(self, target, *args, name: str) -> threading.Thread:
+        def run():
+            try:
+                target(*args)
+            except Exception as e:
+                self.fail(name, e)
+        return threading.Thread(target=run, name=name)
+
+    def fail(self, name: str, error: Exception):
+        self.errors.append(error)
+        self.cancel.set()
+        print(f"❌ 管線「{name}」出錯，停止其他階段：{error!r}")
+
+    def put(self, q: queue.Queue, item):
+        """下游已停止時丟掉，不會卡在已滿的 queue"""
+        while not self.cancel.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def items(self, q: queue.Queue):
+        """逐一取出直到 None；cancel 後立即停止"""
+        while not self.cancel.is_set():
+            try:
+                item = q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is None:
+                return
+            yield item
+
+
+def fetch_stage(pipeline: Pipeline, seen: SeenStore | None, feed_cache: dict, out_q: queue.Queue, incremental: bool = False):
+    """第一段：每個分類抓完就放進 out_q（seen 為 None 時不過濾已推播的新聞；incremental 時只抓上一版之後的新聞）"""
+    try:
+        for category, items in fetcher.iter_categories(feed_cache, seen, incremental):
+            if pipeline.cancel.is_set():
+                break
+            pipeline.put(out_q, (category, items))
+    finally:
+        pipeline.put(out_q, None)
+
+
+def summarise_stage(pipeline: Pipeline, in_q: queue.Queue, out_q: queue.Queue, clusterer: dedup.StreamClusterer,
+                    fetched_news: dict, all_news: dict, timings: dict, wanted: set[str]):
+    """
+    第二段：近似重複分群、組 prompt 後交給 Gemini；每個分類完成（或沒有新聞、失敗）時放進 out_q。
+    沒有收件者訂閱的分類（不在 wanted 裡）不摘要，也不記錄為已推播
+    """
+    timings_lock = threading.Lock()   # on_done 在 pool 的執行緒上執行，+= 不是原子操作
+
+    def on_done(category: str, future):
         try:
-            with urlopen(req, timeout=15) as resp:
-                result = json.loads(resp.read().decode())
-                if not result.get("ok"):
-                    print(f"⚠️ Telegram 發送失敗 (chat_id: {chat_id}): {result}")
-                else:
-                    print(f"✅ 訊息已發送到 {chat_id}")
+            result, elapsed = future.result()
+            with timings_lock:
+                timings["summarise"] += elapsed
+            print(f"  ✅ {category}：{len(result)} 字（{elapsed:.1f} 秒）")
+            pipeline.put(out_q, (category, result.strip()))
+        except MissingSetting as e:
+            # 設定錯誤每個分類都會失敗，不是單一分類的問題：停止整條管線，讓這次執行失敗
+            pipeline.fail("summarise", e)
+            pipeline.put(out_q, (category, None))
         except Exception as e:
-            print(f"⚠️ Telegram 發送失敗 (chat_id: {chat_id}): {e}")
+            print(f"  ❌ {category} 摘要失敗：{e}")
+            pipeline.put(out_q, (category, None))
+
+    try:
+        with ThreadPoolExecutor(max_workers=GEMINI_CONCURRENCY) as pool:
+            for category, items in pipeline.items(in_q):
+                if category not in wanted:
+                    pipeline.put(out_q, (category, None))
+                    continue
+                fetched_news[category] = items
+                with metrics.timer("dedup_seconds", category=category):
+                    all_news[category] = clusterer.add(items)
+                if not all_news[category]:
+                    pipeline.put(out_q, (category, None))
+                    continue
+                future = pool.submit(summarise_category, category, build_category_prompt(category, all_news[category]))
+                future.add_done_callback(lambda f, c=category: on_done(c, f))
+            if pipeline.cancel.is_set():
+                pool.shutdown(wait=False, cancel_futures=True)   # 還沒送出的分類不再呼叫 Gemini
+    finally:
+        pipeline.put(out_q, None)
+
+
+def send_stage(pipeline: Pipeline, in_q: queue.Queue, header: str, sections: dict[str, str],
+               groups: dict[tuple[str, ...], list[str]]):
+    """
+    第三段：依 feeds.toml 的分類順序放行摘要；TELEGRAM_PROGRESSIVE 時每放行一個分類，
+    就推播給訂閱該分類的收件者（每組收件者的第一則加上標題）；各分類的推播結果最後合成一份推播結果檔
+    """
+    order, ready, next_index = list(fetcher.sources.feeds), {}, 0
+    progressive = flag("TELEGRAM_PROGRESSIVE")
+    started = set()  # 已收到第一則（含標題）的簽章
+    delivered, send_seconds = [], 0.0
+
+    def release(category: str):
+        text = ready.pop(category)
+        if text is None:
+            return
+        if progressive:
+            batches = []
+            for signature, chat_ids in groups.items():
+                if category in signature:
+                    batches.append((chat_ids, text if signature in started else f"{header}\n\n{text}"))
+                    started.add(signature)
+            start = time.monotonic()
+            report = notifier.send_each(batches, record=False)
+            nonlocal send_seconds
+            send_seconds += time.monotonic() - start
+            delivered.extend(dict(r, category=category) for r in report)
+        sections[category] = text
+
+    try:
+        for category, text in pipeline.items(in_q):
+            ready[category] = text
+            while next_index < len(order) and order[next_index] in ready:
+                release(order[next_index])
+                next_index += 1
+        for category in order[next_index:]:  # 上一段提早結束時，已完成的仍依序放行
+            if pipeline.cancel.is_set():
+                return
+            if category in ready:
+                release(category)
+    finally:
+        if delivered:
+            telegram.write_report(delivered, send_seconds)
 
 
 # ─── 主程式 ──────────────────────────────────────────────
 def main():
     print("📡 正在抓取新聞...")
-    seen = load_seen()
+    seen = SeenStore.load(SEEN_FILE, legacy_json=LEGACY_SEEN_FILE)
     print(f"📋 已記錄 {len(seen)} 則推播過的新聞")
 
-    all_news = fetch_all_news(seen)
+    feed_cache = load_feed_cache()
+    # 近似重複分群：同一事件只送一則給 Gemini；自動排程才比對跨天的重複報導
+    near_dup = dedup.load_history(NEAR_DUP_FILE)
+    is_manual = settings.is_manual
+    incremental = settings.incremental
+    clusterer = dedup.StreamClusterer(None if is_manual else near_dup)
 
+    today = datetime.now(TW_TZ).strftime("%Y/%m/%d (%A)")
+    edition = f" {settings.edition}" if settings.edition else ""
+    header = f"<b>📰 每日新聞摘要 — {today}{edition}</b>"
+    fetched_news, all_news, sections = {}, {}, {}
+    timings = {"summarise": 0.0}
+    # 每個分類只摘要一次，依收件者的分類偏好組裝；沒人訂閱的分類不摘要
+    groups = subscribers.from_settings(list(fetcher.sources.feeds))
+
+    print("🤖 抓完一個分類就用 Gemini 2.5 Flash 產生摘要（抓取、摘要、推播同時進行）...")
+    start = time.monotonic()
+    fetched_q = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    summary_q = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    pipeline = Pipeline()
+    stages = [
+        pipeline.thread(fetch_stage, pipeline, None if is_manual else seen, feed_cache, fetched_q, incremental, name="fetch"),
+        pipeline.thread(summarise_stage, pipeline, fetched_q, summary_q, clusterer, fetched_news, all_news, timings,
+                        subscribers.wanted(groups), name="summarise"),
+        pipeline.thread(send_stage, pipeline, summary_q, header, sections, groups, name="send"),
+    ]
+    for stage in stages:
+        stage.start()
+    for stage in stages:
+        stage.join()
+    metrics.observe("pipeline_seconds", time.monotonic() - start)
+    print(f"⏱️ 管線總耗時 {time.monotonic() - start:.1f} 秒（各分類摘要加總 {timings['summarise']:.1f} 秒）")
+    save_feed_cache(feed_cache)  # 手動測試也保留，重跑時可直接用 304
+    if pipeline.errors:
+        # 任何一段失敗都不算推播成功：不記錄已推播、高水位也不前進，讓排程以失敗結束
+        raise pipeline.errors[0]
+
+    dedup_stats = clusterer.stats
+    metrics.inc("dedup_merged", dedup_stats["merged"])
+    metrics.inc("dedup_history_hits", dedup_stats["history_hits"])
+    print(
+        f"🧩 近似重複：{dedup_stats['merged']} 則併入 {dedup_stats['clusters']} 個新聞群組，"
+        f"{dedup_stats['history_hits']} 則與先前推播的新聞重複"
+    )
     total = sum(len(v) for v in all_news.values())
     print(f"📰 今天共抓取 {total} 則新聞（未推播過）")
 
+    if total == 0 and incremental:
+        print("ℹ️ 增量模式：上一版之後沒有新的新聞，這一版略過")
+        return
     if total == 0:
         send_telegram("⚠️ 今天無法抓取新聞，請檢查 RSS 來源。")
         return
 
-    print("🤖 正在用 Gemini 2.5 Flash 產生摘要（分類分批處理）...")
-    today = datetime.now(TW_TZ).strftime("%Y/%m/%d (%A)")
-    parts = [f"<b>📰 每日新聞摘要 — {today}</b>\n"]
-
-    import time
-    for category, items in all_news.items():
-        if not items:
-            continue
-        try:
-            result = call_ai(build_category_prompt(category, items))
-            print(f"  ✅ {category}：{len(result)} 字")
-            parts.append(result.strip())
-            time.sleep(3)
-        except Exception as e:
-            print(f"  ❌ {category} 摘要失敗：{e}")
-
-    print(f"📋 組合完成，總長度：{len(chr(10).join(parts))} 字，共 {len(parts)-1} 個分類")
-
-    summary = "\n\n".join(parts)
-
-    # Telegram 訊息長度限制 4096 字
-    if len(summary) > 4096:
-        summary = summary[:4090] + "\n..."
-
-    print("📤 正在發送到 Telegram...")
-    send_telegram(summary)
+    print(f"📋 組合完成，總長度：{len(chr(10).join(sections.values()))} 字，共 {len(sections)} 個分類")
+    if flag("TELEGRAM_PROGRESSIVE"):
+        print("📤 已逐分類發送到 Telegram")
+    else:
+        # 超過 Telegram 4096 字上限時，send_telegram 會依分類切成多則依序發送
+        print("📤 正在發送到 Telegram...")
+        send_digest(subscribers.Digest(header + "\n", sections), groups)
 
     # 推播成功後才記錄（手動測試模式不記錄，避免影響明天的自動推播）
-    if not IS_MANUAL:
-        for items in all_news.values():
+    if not is_manual:
+        for items in fetched_news.values():  # 被併掉的相似報導也一起記錄
             mark_seen(items, seen)
-        save_seen(seen)
+        seen.save(SEEN_FILE)
+        dedup.remember(all_news, near_dup)
+        near_dup.save(NEAR_DUP_FILE)
+        archive.record_digest("news_bot_gemini", all_news)
+        if incremental:
+            print(f"📍 {high_water.commit(feed_cache)} 個來源的高水位前進")
+            save_feed_cache(feed_cache)
         print(f"💾 已記錄本次推播標題，總計 {len(seen)} 筆")
     else:
         print("ℹ️ 手動測試模式，不記錄推播標題")
@@ -368,4 +335,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    runner.run("news_bot_gemini", main)
@@ -16,43 +16,20 @@ AI 模型：OpenAI GPT-4o-mini
 
 import os
 import json
-import re
-from datetime import datetime, timezone, timedelta
-from urllib.request import urlopen, Request
+from datetime import datetime
 
-# ─── 設定 ─────────────────────────────────────────────────────────────────────
-TELEGRAM_BOT_TOKEN = os.environ["TELEGRAM_BOT_TOKEN"]
-TELEGRAM_CHAT_IDS  = [cid.strip() for cid in os.environ["TELEGRAM_CHAT_ID"].split(",")]
-OPENAI_API_KEY     = os.environ["OPENAI_API_KEY"]
-GITHUB_PAGES_URL   = os.environ.get("GITHUB_PAGES_URL", "https://你的帳號.github.io/daily-news-bot")
+from botcore import llm_stream, runner, summarise, telegram
+from botcore.config import TW_TZ, MissingSetting, settings
+from botcore.summarise import strip_code_fence
 
-TW_TZ    = timezone(timedelta(hours=8))
+# ─── 設定 ─────────────────────────────────────────────────────────────────────
 NOW      = datetime.now(TW_TZ)
 NOW_STR  = NOW.strftime("%Y/%m/%d (%A)")
 NOW_FILE = NOW.strftime("%Y-%m-%d")
 
-# ─── OpenAI API 呼叫 ──────────────────────────────────────────────────────────
-def call_openai(system_prompt: str, user_prompt: str, model: str = "gpt-4o-mini") -> str:
-    body = json.dumps({
-        "model": model,
-        "max_tokens": 4096,
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user",   "content": user_prompt},
-        ],
-    }).encode("utf-8")
-    req = Request(
-        "https://api.openai.com/v1/chat/completions",
-        data=body,
-        headers={
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {OPENAI_API_KEY}",
-        },
-        method="POST",
-    )
-    with urlopen(req, timeout=120) as resp:
-        data = json.loads(resp.read().decode())
-    return data["choices"][0]["message"]["content"]
+# ─── 元件（API key 與 Telegram 設定在呼叫時才讀取）────────────────────────────
+summariser = summarise.OpenAIChat("gpt-4o-mini", max_tokens=4096)
+notifier   = telegram.Notifier(disable_preview=False, plain_fallback=True)
 
 
 # ─── System Prompt ────────────────────────────────────────────────────────────
@@ -112,9 +89,14 @@ def generate_report_data() -> dict:
         f"scores/comments 的 key 必須與 analysis_dimensions 完全一致。"
     )
 
-    raw = call_openai(SYSTEM_PROMPT, user_prompt)
-    raw = re.sub(r'^```json?\s*\n?', '', raw.strip())
-    raw = re.sub(r'\n?```\s*$', '', raw.strip())
+    # JSON 解析失敗的回應不進快取，重跑時才會重新產生
+    # JSON 物件一閉合就停止接收，不必等到 max_tokens
+    raw = summariser(
+        SYSTEM_PROMPT, user_prompt,
+        validate=lambda r: json.loads(strip_code_fence(r)),
+        stop_when=llm_stream.JsonObjectDone(),
+    )
+    raw = strip_code_fence(raw)
     print(f"🔍 [DEBUG] JSON 長度: {len(raw)} 字元")
     print(f"🔍 [DEBUG] 前 300 字:\n{raw[:300]}")
     return json.loads(raw)
@@ -271,30 +253,7 @@ def save_html_report(html_content: str) -> str:
 
 # ─── Telegram 發送 ────────────────────────────────────────────────────────────
 def send_telegram(text: str):
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    for chat_id in TELEGRAM_CHAT_IDS:
-        body = json.dumps({
-            "chat_id": chat_id,
-            "text": text,
-            "parse_mode": "HTML",
-            "disable_web_page_preview": False,
-        }).encode("utf-8")
-        req = Request(url, data=body, headers={"Content-Type": "application/json"}, method="POST")
-        try:
-            with urlopen(req, timeout=15) as resp:
-                result = json.loads(resp.read().decode())
-            if not result.get("ok"):
-                raise RuntimeError(f"Telegram API 錯誤: {result}")
-            print(f"✅ 訊息已發送到 {chat_id}")
-        except Exception as e:
-            print(f"⚠️ Telegram HTML 發送失敗 ({chat_id}): {e}")
-            plain = re.sub(r'<a href="([^"]+)">[^<]*</a>', r'\1', text)
-            plain = re.sub(r'<[^>]+>', '', plain)
-            body2 = json.dumps({"chat_id": chat_id, "text": plain}).encode("utf-8")
-            req2 = Request(url, data=body2, headers={"Content-Type": "application/json"}, method="POST")
-            with urlopen(req2, timeout=15):
-                pass
-            print(f"✅ 訊息已發送到 {chat_id}（純文字 fallback）")
+    notifier.send(text)
 
 
 # ─── 主程式 ────────────────────────────────────────────────────────────────────
@@ -307,6 +266,8 @@ def main():
     try:
         report_data = generate_report_data()
         print("✅ JSON 解析成功")
+    except MissingSetting:
+        raise   # 設定錯誤不是報告產生失敗：讓這次執行失敗，不推播失敗通知
     except (json.JSONDecodeError, KeyError, IndexError) as e:
         print(f"❌ JSON 解析失敗: {e}")
         send_telegram(f"⚠️ <b>VoteFlux 競品週報 — {NOW_STR}</b>\n\n報告產生失敗，請手動檢查 Action log。")
@@ -316,7 +277,7 @@ def main():
     html_content = build_html(report_data)
     save_html_report(html_content)
 
-    report_url = f"{GITHUB_PAGES_URL}/voteflux-weekly-{NOW_FILE}.html"
+    report_url = f"{settings.github_pages_url}/voteflux-weekly-{NOW_FILE}.html"
     message = f'🤖 <b>VoteFlux 競品週報 — {NOW_STR}</b>\n\n🔗 <a href="{report_url}">📖 查看完整報告</a>'
     print("\n📤 正在推播到 Telegram...")
     send_telegram(message)
@@ -324,4 +285,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    runner.run("voteflux_bot", main)
@@ -11,17 +11,13 @@ AI 模型：OpenAI gpt-4o-mini + web_search_preview tool（真實抓取當週新
 
 import os
 import json
-import re
-from datetime import datetime, timezone, timedelta
-from urllib.request import urlopen, Request
+from datetime import datetime, timedelta
 
-# ─── 設定 ─────────────────────────────────────────────────────────────────────
-TELEGRAM_BOT_TOKEN = os.environ["TELEGRAM_BOT_TOKEN"]
-TELEGRAM_CHAT_IDS  = [cid.strip() for cid in os.environ["TELEGRAM_CHAT_ID"].split(",")]
-OPENAI_API_KEY     = os.environ["OPENAI_API_KEY"]
-GITHUB_PAGES_URL   = os.environ.get("GITHUB_PAGES_URL", "https://你的帳號.github.io/daily-news-bot")
+from botcore import llm_stream, runner, summarise, telegram
+from botcore.config import TW_TZ, MissingSetting, settings
+from botcore.summarise import strip_code_fence
 
-TW_TZ      = timezone(timedelta(hours=8))
+# ─── 設定 ─────────────────────────────────────────────────────────────────────
 TODAY      = datetime.now(TW_TZ)
 TODAY_STR  = TODAY.strftime("%Y/%m/%d (%A)")
 TODAY_FILE = TODAY.strftime("%Y-%m-%d")
@@ -30,42 +26,10 @@ WEEK_START = (TODAY - timedelta(days=6)).strftime("%Y/%m/%d")
 WEEK_END   = TODAY.strftime("%Y/%m/%d")
 WEEK_RANGE = f"{WEEK_START} ~ {WEEK_END}"
 
-# ─── OpenAI Responses API（含 web_search_preview tool）───────────────────────
-def call_openai_with_search(system_prompt: str, user_prompt: str) -> str:
-    """
-    呼叫 OpenAI Responses API，附帶 web_search_preview tool。
-    OpenAI 會自動搜尋後再回覆。
-    """
-    body = json.dumps({
-        "model": "gpt-4o-mini",
-        "tools": [{"type": "web_search_preview"}],
-        "input": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user",   "content": user_prompt},
-        ],
-    }).encode("utf-8")
-
-    req = Request(
-        "https://api.openai.com/v1/responses",
-        data=body,
-        headers={
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {OPENAI_API_KEY}",
-        },
-        method="POST",
-    )
-
-    with urlopen(req, timeout=120) as resp:
-        data = json.loads(resp.read().decode())
-
-    # 從 output 陣列中取 message 類型的文字
-    for item in data.get("output", []):
-        if item.get("type") == "message":
-            for block in item.get("content", []):
-                if block.get("type") == "output_text":
-                    return block["text"]
-
-    raise RuntimeError(f"OpenAI Responses API 回傳格式異常: {json.dumps(data)[:500]}")
+# ─── 元件（API key 與 Telegram 設定在呼叫時才讀取）────────────────────────────
+# OpenAI Responses API + web_search_preview tool：OpenAI 會先搜尋再回覆
+summariser = summarise.OpenAIResponses("gpt-4o-mini", tools=[{"type": "web_search_preview"}], label="GPT-4o-mini + Web Search")
+notifier   = telegram.Notifier(disable_preview=False, plain_fallback=True)
 
 
 # ─── System Prompt ────────────────────────────────────────────────────────────
@@ -130,12 +94,14 @@ def generate_report_data() -> dict:
 
 只輸出 JSON，不要有任何其他文字。"""
 
-    raw = call_openai_with_search(SYSTEM_PROMPT, user_prompt)
-
-    # 清理 markdown 包裹
-    raw = raw.strip()
-    raw = re.sub(r'^```json?\s*\n?', '', raw)
-    raw = re.sub(r'\n?```\s*$', '', raw)
+    # JSON 解析失敗的回應不進快取，重跑時才會重新產生
+    # JSON 物件一閉合就停止接收
+    raw = summariser(
+        SYSTEM_PROMPT, user_prompt,
+        validate=lambda r: json.loads(strip_code_fence(r)),
+        stop_when=llm_stream.JsonObjectDone(),
+    )
+    raw = strip_code_fence(raw)
 
     print(f"🔍 [DEBUG] JSON 長度: {len(raw)} 字元")
     print(f"🔍 [DEBUG] 前 300 字:\n{raw[:300]}")
@@ -266,30 +232,7 @@ def save_html_report(html_content: str) -> str:
 
 # ─── Telegram ──────────────────────────────────────────────────────────────────
 def send_telegram(text: str):
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    for chat_id in TELEGRAM_CHAT_IDS:
-        body = json.dumps({
-            "chat_id": chat_id,
-            "text": text,
-            "parse_mode": "HTML",
-            "disable_web_page_preview": False,
-        }).encode("utf-8")
-        req = Request(url, data=body, headers={"Content-Type": "application/json"}, method="POST")
-        try:
-            with urlopen(req, timeout=15) as resp:
-                result = json.loads(resp.read().decode())
-            if not result.get("ok"):
-                raise RuntimeError(f"Telegram API 錯誤: {result}")
-            print(f"✅ 訊息已發送到 {chat_id}")
-        except Exception as e:
-            print(f"⚠️ Telegram HTML 發送失敗 ({chat_id}): {e}")
-            plain = re.sub(r'<a href="([^"]+)">[^<]*</a>', r'\1', text)
-            plain = re.sub(r'<[^>]+>', '', plain)
-            body2 = json.dumps({"chat_id": chat_id, "text": plain}).encode("utf-8")
-            req2 = Request(url, data=body2, headers={"Content-Type": "application/json"}, method="POST")
-            with urlopen(req2, timeout=15):
-                pass
-            print(f"✅ 訊息已發送到 {chat_id}（純文字 fallback）")
+    notifier.send(text)
 
 
 # ─── 主程式 ────────────────────────────────────────────────────────────────────
@@ -302,6 +245,8 @@ def main():
     try:
         report_data = generate_report_data()
         print("✅ JSON 解析成功")
+    except MissingSetting:
+        raise   # 設定錯誤不是週報產生失敗：讓這次執行失敗，不推播失敗通知
     except Exception as e:
         print(f"❌ 週報產生失敗: {e}")
         send_telegram(f"⚠️ <b>預測市場週報 — {WEEK_RANGE}</b>\n\n週報產生失敗，請手動檢查 Action log。")
@@ -311,7 +256,7 @@ def main():
     html_content = build_html(report_data)
     save_html_report(html_content)
 
-    report_url = f"{GITHUB_PAGES_URL}/weekly-{TODAY_FILE}.html"
+    report_url = f"{settings.github_pages_url}/weekly-{TODAY_FILE}.html"
     message = (
         f"🎰 <b>預測市場週報：老司機的真心話</b>\n"
         f"📅 {WEEK_RANGE}\n\n"
@@ -323,4 +268,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    runner.run("voteflux_weekly", main)